@@ -5,13 +5,16 @@ import functools
 import logging
 import random
 import secrets
+import threading
+import time
 import warnings
 from argparse import Namespace
+from array import array
 from collections import Counter, deque, defaultdict
-from collections.abc import Collection, MutableSequence
+from collections.abc import Collection, ItemsView, KeysView, MutableSequence, ValuesView
 from enum import IntEnum, IntFlag
-from typing import (AbstractSet, Any, Callable, ClassVar, Dict, Iterable, Iterator, List, Literal, Mapping, NamedTuple,
-                    Optional, Protocol, Set, Tuple, Union, TYPE_CHECKING, Literal, overload)
+from typing import (AbstractSet, Any, Callable, ClassVar, Deque, Dict, Iterable, Iterator, List, Literal, Mapping,
+                    NamedTuple, Optional, Protocol, Set, Tuple, Union, TYPE_CHECKING, Literal, overload)
 import dataclasses
 
 from typing_extensions import NotRequired, TypedDict
@@ -87,6 +90,8 @@ class MultiWorld():
     progression_balancing: Dict[int, Options.ProgressionBalancing]
     completion_condition: Dict[int, Callable[[CollectionState], bool]]
     indirect_connections: Dict[Region, Set[Entrance]]
+    sphere_cache: Dict[bool, SphereSearch]
+    """The last search_spheres results, by whether the search was for sendable spheres"""
     exclude_locations: Dict[int, Options.ExcludeLocations]
     priority_locations: Dict[int, Options.PriorityLocations]
     start_inventory: Dict[int, Options.StartInventory]
@@ -166,6 +171,7 @@ class MultiWorld():
         self.early_items = {player: {} for player in self.player_ids}
         self.local_early_items = {player: {} for player in self.player_ids}
         self.indirect_connections = {}
+        self.sphere_cache = {}
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
         self.plando_item_blocks = {}
 
@@ -589,24 +595,7 @@ class MultiWorld():
         locations is followed by an empty set, and then a set of all of the
         unreachable locations.
         """
-        state = CollectionState(self)
-        locations = set(self.get_filled_locations())
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        yield from self.search_spheres(False).iter_spheres()
 
     def get_sendable_spheres(self) -> Iterator[Set[Location]]:
         """
@@ -615,46 +604,86 @@ class MultiWorld():
         If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
         and then a set of all of the unreachable locations.
         """
+        yield from self.search_spheres(True).iter_spheres()
+
+    def search_spheres(self, sendable: bool, with_states: bool = False) -> SphereSearch:
+        """
+        Returns the sphere search get_spheres or get_sendable_spheres are based on. Searches are cached until an item
+        gets placed somewhere else, replaced or reclassified, the precollected items change, or a world changes how
+        its regions are searched, so everything using them after generation, like the accessibility check, the
+        multidata and the spoiler, shares one search. Concurrent calls wait for the first. Anything else that changes
+        logic afterwards, like access rules, has to clear `sphere_cache`.
+
+        :param sendable: If True, locations that can't be sent by the multiserver are collected as soon as they can be
+        reached, instead of making up spheres.
+        :param with_states: If True, the search also keeps a copy of the state after each sphere.
+        """
+        # Item equality only compares name and player, so the key also has the identity of each item, which the key
+        # keeps alive, and its classification.
+        key = (tuple((item, id(item), item.classification) if item else None
+                     for item in (location.item for location in self.get_locations())),
+               tuple((item, id(item), item.classification)
+                     for items in self.precollected_items.values() for item in items),
+               tuple((world.explicit_indirect_conditions, world.incremental_reachability)
+                     for world in self.worlds.values()))
+        with _sphere_cache_lock:
+            search = self.sphere_cache.get(sendable)
+            if not search or search.key != key or with_states and search.states is None:
+                search = self.sphere_cache[sendable] = self._search_spheres(key, sendable, with_states)
+        return search
+
+    def drop_sphere_states(self, search: SphereSearch) -> None:
+        """Keeps the cached sphere search, but without the states after each sphere, if it is still cached."""
+        with _sphere_cache_lock:
+            for sendable, cached in self.sphere_cache.items():
+                if cached is search:
+                    self.sphere_cache[sendable] = search._replace(states=None)
+
+    def _search_spheres(self, key: Tuple[Any, ...], sendable: bool, with_states: bool) -> SphereSearch:
         state = CollectionState(self)
         locations: Set[Location] = set()
         events: Set[Location] = set()
         for location in self.get_filled_locations():
-            if type(location.item.code) is int and type(location.address) is int:
+            if not sendable or type(location.item.code) is int and type(location.address) is int:
                 locations.add(location)
             else:
                 events.add(location)
+        frontier = _SphereFrontier(state, locations)
+        event_frontier = _SphereFrontier(state, events)
+        record = frontier.indexed or event_frontier.indexed
+        spheres: List[Set[Location]] = []
+        states: Optional[List[CollectionState]] = [] if with_states else None
 
-        while locations:
-            sphere: Set[Location] = set()
-
+        while True:
             # cull events out
-            done_events: Set[Union[Location, None]] = {None}
+            done_events = event_frontier.pop_reachable()
             while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+                modified = _collect_locations(state, done_events, record)
+                frontier.update(modified)
+                event_frontier.update(modified)
+                done_events = event_frontier.pop_reachable()
 
-            yield sphere
+            # events are culled one last time after the last sphere, so the final state has everything reachable
+            if not frontier:
+                break
+            sphere = frontier.pop_reachable()
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
                 break
+            spheres.append(sphere)
 
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+            modified = _collect_locations(state, sphere, record)
+            frontier.update(modified)
+            event_frontier.update(modified)
+            if states is not None:
+                states.append(state.copy())
+
+        return SphereSearch(key, spheres, frontier.remaining(), event_frontier.remaining(), state, states)
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
-        """Check if accessibility rules are fulfilled with current or supplied state."""
-        if not state:
-            state = CollectionState(self)
+        """
+        Check if accessibility rules are fulfilled with current or supplied state.
+        Without a supplied state, the cached search of get_sendable_spheres is used instead of searching again.
+        """
         players: Dict[str, Set[int]] = {
             "minimal": set(),
             "items": set(),
@@ -682,8 +711,37 @@ class MultiWorld():
                 return False  # still locations required to be collected
             return True
 
+        def report_missing() -> bool:
+            """Report the locations that can't be accessed"""
+            if __debug__:
+                from Fill import FillError
+                raise FillError(
+                    f"Could not access required locations for accessibility check. Missing: {locations}",
+                    multiworld=self,
+                )
+            # ran out of places and did not finish yet, quit
+            logging.warning(f"Could not access required locations for accessibility check."
+                            f" Missing: {locations}")
+            return False
+
         locations = [location for location in self.get_locations() if location_relevant(location)]
 
+        if not state:
+            if not locations:
+                return False
+            search = self.search_spheres(True)
+            state = search.state
+            unreachable = search.unreachable | search.unreachable_events
+            # locations without an item are not part of the search
+            locations = [location for location in locations if location in unreachable
+                         or not location.item and not location.can_reach(state)]
+            beatable_fulfilled = self.has_beaten_game(state)
+            if all_done():
+                return True
+            if locations:
+                return report_missing()
+            return False
+
         while locations:
             sphere: List[Location] = []
             for n in range(len(locations) - 1, -1, -1):
@@ -691,16 +749,7 @@ class MultiWorld():
                     sphere.append(locations.pop(n))
 
             if not sphere:
-                if __debug__:
-                    from Fill import FillError
-                    raise FillError(
-                        f"Could not access required locations for accessibility check. Missing: {locations}",
-                        multiworld=self,
-                    )
-                # ran out of places and did not finish yet, quit
-                logging.warning(f"Could not access required locations for accessibility check."
-                                f" Missing: {locations}")
-                return False
+                return report_missing()
 
             for location in sphere:
                 if location.item:
@@ -718,11 +767,516 @@ class MultiWorld():
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class _ChangeTrackingCounter(Counter):
+    """
+    Counter used as prog_items of players with incremental_reachability. Remembers the item names that were modified
+    since `changed` was last cleared, a None entry meaning the whole Counter may have changed.
+    """
+    changed: Set[Optional[str]]
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.changed = set()
+        super().__init__(*args, **kwargs)
+
+    def __setitem__(self, key: str, value: int) -> None:
+        self.changed.add(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self.changed.add(key)
+        super().__delitem__(key)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self.changed.add(None)
+        super().update(*args, **kwargs)
+
+    def clear(self) -> None:
+        self.changed.add(None)
+        super().clear()
+
+    def pop(self, *args: Any) -> Any:
+        self.changed.add(None)
+        return super().pop(*args)
+
+    def copy(self) -> _ChangeTrackingCounter:
+        ret = _ChangeTrackingCounter(self)
+        ret.changed = self.changed.copy()
+        return ret
+
+
+class _IndexedCounter(Counter):
+    """
+    Counter used as prog_items of players whose world sets compact_item_counts. The counts of the item names in
+    `indices` are kept in an array, any other name is stored in the Counter itself. A count of 0 in the array means
+    the name is not in the Counter.
+    If `changed` is not None, it remembers modified item names like _ChangeTrackingCounter does.
+    """
+    __slots__ = ("indices", "counts", "changed")
+    indices: Mapping[str, int]
+    counts: array
+    changed: Optional[Set[Optional[str]]]
+
+    def __init__(self, indices: Mapping[str, int], changed: Optional[Set[Optional[str]]] = None,
+                 counts: Optional[array] = None) -> None:
+        super().__init__()
+        self.indices = indices
+        # counts are widened to a signed 64-bit array the first time a value doesn't fit into 16 bits
+        self.counts = array("H", bytes(2 * len(indices))) if counts is None else counts
+        self.changed = changed
+
+    def __getitem__(self, key: str) -> int:
+        index = self.indices.get(key)
+        if index is None:
+            return dict.get(self, key, 0)
+        return self.counts[index]
+
+    def __setitem__(self, key: str, value: int) -> None:
+        if self.changed is not None:
+            self.changed.add(key)
+        index = self.indices.get(key)
+        if index is None:
+            dict.__setitem__(self, key, value)
+            return
+        try:
+            self.counts[index] = value
+        except OverflowError:
+            self.counts = array("q", self.counts)
+            self.counts[index] = value
+
+    def __delitem__(self, key: str) -> None:
+        if self.changed is not None:
+            self.changed.add(key)
+        index = self.indices.get(key)
+        if index is None:
+            super().__delitem__(key)
+        else:
+            self.counts[index] = 0
+
+    def __contains__(self, key: object) -> bool:
+        index = self.indices.get(key)  # type: ignore[call-overload]
+        if index is None:
+            return dict.__contains__(self, key)
+        return self.counts[index] != 0
+
+    def __iter__(self) -> Iterator[str]:
+        counts = self.counts
+        yield from (key for key, index in self.indices.items() if counts[index])
+        yield from dict.__iter__(self)
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + len(self.counts) - self.counts.count(0)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        index = self.indices.get(key)
+        if index is None:
+            return dict.get(self, key, default)
+        return self.counts[index] or default
+
+    def keys(self) -> KeysView[str]:  # type: ignore[override]
+        return KeysView(self)
+
+    def values(self) -> ValuesView[int]:  # type: ignore[override]
+        return ValuesView(self)
+
+    def items(self) -> ItemsView[str, int]:  # type: ignore[override]
+        return ItemsView(self)
+
+    def update(self, iterable: Any = None, /, **kwargs: int) -> None:  # type: ignore[override]
+        if iterable is not None:
+            if isinstance(iterable, Mapping):
+                for key, count in iterable.items():
+                    self[key] += count
+            else:
+                for key in iterable:
+                    self[key] += 1
+        if kwargs:
+            self.update(kwargs)
+
+    def setdefault(self, key: str, default: int = 0) -> int:  # type: ignore[override]
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key: str, *default: Any) -> Any:
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def popitem(self) -> Tuple[str, int]:
+        for key in self:
+            return key, self.pop(key)
+        raise KeyError("popitem(): Counter is empty")
+
+    def clear(self) -> None:
+        if self.changed is not None:
+            self.changed.add(None)
+        dict.clear(self)
+        self.counts = array(self.counts.typecode, bytes(self.counts.itemsize * len(self.counts)))
+
+    def copy(self) -> _IndexedCounter:
+        ret = _IndexedCounter(self.indices, None if self.changed is None else self.changed.copy(), self.counts[:])
+        dict.update(ret, dict.items(self))
+        return ret
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (_IndexedCounter, (self.indices, None if self.changed is None else self.changed.copy(), self.counts),
+                None, None, iter(list(dict.items(self))))
+
+
+class _CopyOnAccessCounters(dict):
+    """
+    Mapping of player to prog_items Counter. Counters shared with copies of the state are kept in `shared` and only
+    copied into this mapping once they are accessed, so copying a state doesn't duplicate the Counters of players that
+    are never looked at again. Counters in `shared` must not be modified.
+    """
+    __slots__ = ("shared",)
+    shared: Dict[int, Counter[str]]
+
+    def __init__(self, shared: Optional[Dict[int, Counter[str]]] = None) -> None:
+        super().__init__()
+        self.shared = shared if shared is not None else {}
+
+    def __missing__(self, player: int) -> Counter[str]:
+        counter = self.shared[player].copy()
+        self[player] = counter
+        return counter
+
+    def share(self) -> Dict[int, Counter[str]]:
+        """
+        Returns all Counters for another state to share. This mapping treats them as shared from now on as well, so
+        they are copied again on their next access.
+        """
+        if dict.__len__(self):
+            shared = self.shared.copy()
+            shared.update(dict.items(self))
+            self.shared = shared
+            dict.clear(self)
+        return self.shared
+
+    def _copy_all(self) -> None:
+        for player in self.shared:
+            if not dict.__contains__(self, player):
+                self.__missing__(player)
+
+    def __contains__(self, player: object) -> bool:
+        return dict.__contains__(self, player) or player in self.shared
+
+    def __iter__(self) -> Iterator[int]:
+        self._copy_all()
+        return dict.__iter__(self)
+
+    def __len__(self) -> int:
+        self._copy_all()
+        return dict.__len__(self)
+
+    def __eq__(self, other: object) -> bool:
+        self._copy_all()
+        if isinstance(other, _CopyOnAccessCounters):
+            other._copy_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other: object) -> bool:
+        return not self == other
+
+    def __repr__(self) -> str:
+        self._copy_all()
+        return dict.__repr__(self)
+
+    def get(self, player: int, default: Any = None) -> Any:
+        return self[player] if player in self else default
+
+    def keys(self):
+        self._copy_all()
+        return dict.keys(self)
+
+    def values(self):
+        self._copy_all()
+        return dict.values(self)
+
+    def items(self):
+        self._copy_all()
+        return dict.items(self)
+
+    def copy(self) -> Dict[int, Counter[str]]:
+        self._copy_all()
+        return dict(dict.items(self))
+
+
+class _ItemCounterReadRecorder:
+    """Stands in for one player's prog_items Counter, recording the item names that are looked up or modified."""
+    __slots__ = ("counter", "player", "reads")
+
+    def __init__(self, counter: Counter[str], player: int, reads: Set[Tuple[int, Optional[str]]]) -> None:
+        self.counter = counter
+        self.player = player
+        self.reads = reads
+
+    def __getitem__(self, item: str) -> int:
+        self.reads.add((self.player, item))
+        return self.counter[item]
+
+    def __setitem__(self, item: str, value: int) -> None:
+        self.reads.add((self.player, item))
+        self.counter[item] = value
+
+    def __delitem__(self, item: str) -> None:
+        self.reads.add((self.player, item))
+        del self.counter[item]
+
+    def __contains__(self, item: str) -> bool:
+        self.reads.add((self.player, item))
+        return item in self.counter
+
+    def get(self, item: str, default: Any = None) -> Any:
+        self.reads.add((self.player, item))
+        return self.counter.get(item, default)
+
+    def __iter__(self) -> Iterator[str]:
+        self.reads.add((self.player, None))
+        return iter(self.counter)
+
+    def __len__(self) -> int:
+        self.reads.add((self.player, None))
+        return len(self.counter)
+
+    def __getattr__(self, name: str) -> Any:
+        # anything else, like items() or total(), may depend on every item of the player
+        self.reads.add((self.player, None))
+        return getattr(self.counter, name)
+
+
+class _ProgItemsReadRecorder:
+    """Stands in for CollectionState.prog_items while recording which items an access rule reads."""
+    __slots__ = ("prog_items", "reads")
+
+    def __init__(self, prog_items: Dict[int, Counter[str]], reads: Set[Tuple[int, Optional[str]]]) -> None:
+        self.prog_items = prog_items
+        self.reads = reads
+
+    def __getitem__(self, player: int) -> _ItemCounterReadRecorder:
+        return _ItemCounterReadRecorder(self.prog_items[player], player, self.reads)
+
+    def __setitem__(self, player: int, counter: Counter[str]) -> None:
+        self.reads.add((player, None))
+        self.prog_items[player] = counter
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.prog_items)
+
+    def __len__(self) -> int:
+        return len(self.prog_items)
+
+    def __getattr__(self, name: str) -> Any:
+        # items(), values() and the like hand out the Counters themselves, so every player's items may be read
+        self.reads.update((player, None) for player in self.prog_items)
+        return getattr(self.prog_items, name)
+
+
+class _ReachableRegionsReadRecorder:
+    """
+    Stands in for CollectionState.reachable_regions while recording whose region reachability an access rule reads.
+    As any of a player's items can change which of their regions are reachable, such reads are recorded with an item
+    name of None.
+    """
+    __slots__ = ("reachable_regions", "reads")
+
+    def __init__(self, reachable_regions: Dict[int, Set[Region]], reads: Set[Tuple[int, Optional[str]]]) -> None:
+        self.reachable_regions = reachable_regions
+        self.reads = reads
+
+    def __getitem__(self, player: int) -> Set[Region]:
+        self.reads.add((player, None))
+        return self.reachable_regions[player]
+
+    def __setitem__(self, player: int, regions: Set[Region]) -> None:
+        self.reachable_regions[player] = regions
+
+    def __getattr__(self, name: str) -> Any:
+        self.reads.update((player, None) for player in self.reachable_regions)
+        return getattr(self.reachable_regions, name)
+
+
+class _LocationReadIndex:
+    """
+    Locations that could not be reached, indexed by what that was found to depend on: their parent region if it can't
+    be reached, otherwise the (player, item name) pairs their access rule read. After items are collected, only the
+    locations affected by the modified items need to be checked again.
+    """
+    __slots__ = ("waiting", "by_item", "by_player", "by_region")
+    waiting: Set[Location]
+    by_item: Dict[int, Dict[str, List[Location]]]
+    by_player: Dict[int, List[Location]]
+    """Locations whose access rule read something that may depend on any of the player's items."""
+    by_region: Dict[int, Dict[Region, List[Location]]]
+
+    def __init__(self) -> None:
+        self.waiting = set()
+        self.by_item = {}
+        self.by_player = {}
+        self.by_region = {}
+
+    def can_reach(self, state: CollectionState, location: Location) -> bool:
+        """Checks if location can be reached in state, adding it to the index if it can't."""
+        region = location.parent_region
+        assert region, f"called can_reach on a Location \"{location}\" with no parent_region"
+        if not region.can_reach(state):
+            self.by_region.setdefault(region.player, {}).setdefault(region, []).append(location)
+        else:
+            reads: Set[Tuple[int, Optional[str]]] = set()
+            if state.evaluate_recording_reads(location.access_rule, reads, True):
+                return True
+            if not reads:
+                # nothing to wait for was read, so assume the rule depends on its own player's items somehow
+                reads.add((location.player, None))
+            for player, item_name in reads:
+                if item_name is None:
+                    self.by_player.setdefault(player, []).append(location)
+                else:
+                    self.by_item.setdefault(player, {}).setdefault(item_name, []).append(location)
+        self.waiting.add(location)
+        return False
+
+    def pop_affected(self, state: CollectionState, modified: Set[Tuple[int, Optional[str]]]) -> List[Location]:
+        """
+        Removes the locations that may have become reachable after the modified (player, item name) pairs changed in
+        state from the index and returns them.
+        """
+        affected: List[Location] = []
+        players: Set[int] = set()
+        for player, item_name in modified:
+            players.add(player)
+            by_name = self.by_item.get(player)
+            if not by_name:
+                continue
+            if item_name is None:
+                for locations in by_name.values():
+                    affected += locations
+                by_name.clear()
+            else:
+                affected += by_name.pop(item_name, ())
+        for player in players:
+            affected += self.by_player.pop(player, ())
+        # entrances may read other players' items, so every player's regions could have become reachable
+        for by_region in self.by_region.values():
+            for region in [region for region in by_region if region.can_reach(state)]:
+                affected += by_region.pop(region)
+
+        # a location is indexed once for every item it read, so only return the first of its entries
+        popped: List[Location] = []
+        for location in affected:
+            if location in self.waiting:
+                self.waiting.remove(location)
+                popped.append(location)
+        return popped
+
+
+class SphereSearch(NamedTuple):
+    """The result of MultiWorld.search_spheres."""
+    key: Tuple[Any, ...]
+    """The placement of items the search was done for."""
+    spheres: List[Set[Location]]
+    """The locations reached in each sphere, all non-empty."""
+    unreachable: Set[Location]
+    """The locations that could not be reached."""
+    unreachable_events: Set[Location]
+    """For sendable searches, the locations with unsendable items that could not be reached."""
+    state: CollectionState
+    """The state after collecting everything that could be reached. Not to be modified."""
+    states: Optional[List[CollectionState]]
+    """If requested, a copy of the state after each sphere. Not to be modified."""
+
+    def iter_spheres(self) -> Iterator[Set[Location]]:
+        """Yields copies of the spheres in the format of MultiWorld.get_spheres."""
+        for sphere in self.spheres:
+            yield set(sphere)
+        if self.unreachable:
+            yield set()
+            yield set(self.unreachable)
+
+
+_sphere_cache_lock = threading.Lock()
+
+
+class _SphereFrontier:
+    """
+    The locations a sphere by sphere search has yet to reach. Locations of worlds with incremental_reachability that
+    can't be reached wait in a _LocationReadIndex until something they depend on is modified, while the others are
+    checked again for every sphere.
+    """
+    __slots__ = ("state", "indexed", "unindexed", "candidates", "index")
+    state: CollectionState
+    indexed: bool
+    unindexed: Set[Location]
+    candidates: List[Location]
+    """Locations of worlds with incremental_reachability to check for the next sphere."""
+    index: _LocationReadIndex
+
+    def __init__(self, state: CollectionState, locations: Iterable[Location]) -> None:
+        self.state = state
+        self.unindexed = set()
+        self.candidates = []
+        self.index = _LocationReadIndex()
+        worlds = state.multiworld.worlds
+        for location in locations:
+            if worlds[location.player].incremental_reachability:
+                self.candidates.append(location)
+            else:
+                self.unindexed.add(location)
+        self.indexed = bool(self.candidates)
+
+    def __bool__(self) -> bool:
+        return bool(self.unindexed or self.candidates or self.index.waiting)
+
+    def remaining(self) -> Set[Location]:
+        return self.unindexed | self.index.waiting | set(self.candidates)
+
+    def pop_reachable(self) -> Set[Location]:
+        """Removes the locations that can be reached in the current state and returns them."""
+        state = self.state
+        reachable = {location for location in self.unindexed if location.can_reach(state)}
+        self.unindexed -= reachable
+        for location in self.candidates:
+            if self.index.can_reach(state, location):
+                reachable.add(location)
+        self.candidates = []
+        return reachable
+
+    def update(self, modified: Set[Tuple[int, Optional[str]]]) -> None:
+        """Queues the waiting locations affected by the modified (player, item name) pairs to be checked again."""
+        if self.index.waiting:
+            self.candidates += self.index.pop_affected(self.state, modified)
+
+
+def _collect_locations(state: CollectionState, locations: Iterable[Location],
+                       record: bool) -> Set[Tuple[int, Optional[str]]]:
+    """Collects the items at locations into state, returning the modified (player, item name) pairs if record is set."""
+    modified: Set[Tuple[int, Optional[str]]] = set()
+    prog_items = state.prog_items
+    if record:
+        state.prog_items = _ProgItemsReadRecorder(prog_items, modified)
+    try:
+        for location in locations:
+            state.collect(location.item, True, location)
+    finally:
+        state.prog_items = prog_items
+    return modified
+
+
 class CollectionState():
     prog_items: Dict[int, Counter[str]]
     multiworld: MultiWorld
     reachable_regions: Dict[int, Set[Region]]
     blocked_connections: Dict[int, Set[Entrance]]
+    blocked_connections_by_item: Dict[int, Dict[str, Set[Entrance]]]
+    """For worlds with incremental_reachability, blocked connections by the item names their access rules read."""
+    unindexed_connections: Dict[int, Set[Entrance]]
+    """For worlds with incremental_reachability, blocked connections that have to be retried on every update."""
+    exclusive_region_players: Set[int]
+    """Players whose per-player region containers above are not shared with a copy of this state."""
     advancements: Set[Location]
     path: Dict[Union[Region, Entrance], PathValue]
     locations_checked: Set[Location]
@@ -733,10 +1287,20 @@ class CollectionState():
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        self.prog_items = _CopyOnAccessCounters()
+        for player in parent.get_all_ids():
+            world = parent.worlds[player]
+            if world.item_name_indices is not None:
+                self.prog_items[player] = _IndexedCounter(world.item_name_indices,
+                                                          set() if world.incremental_reachability else None)
+            else:
+                self.prog_items[player] = _ChangeTrackingCounter() if world.incremental_reachability else Counter()
         self.multiworld = parent
         self.reachable_regions = {player: set() for player in parent.get_all_ids()}
         self.blocked_connections = {player: set() for player in parent.get_all_ids()}
+        self.blocked_connections_by_item = {player: {} for player in parent.get_all_ids()}
+        self.unindexed_connections = {player: set() for player in parent.get_all_ids()}
+        self.exclusive_region_players = set(parent.get_all_ids())
         self.advancements = set()
         self.path = {}
         self.locations_checked = set()
@@ -750,7 +1314,12 @@ class CollectionState():
 
     def update_reachable_regions(self, player: int):
         self.stale[player] = False
+        if player not in self.exclusive_region_players:
+            self._unshare_region_containers(player)
         world: AutoWorld.World = self.multiworld.worlds[player]
+        if world.incremental_reachability and world.explicit_indirect_conditions:
+            self._update_reachable_regions_incremental(player)
+            return
         reachable_regions = self.reachable_regions[player]
         queue = deque(self.blocked_connections[player])
         start: Region = world.get_region(world.origin_region_name)
@@ -815,17 +1384,125 @@ class CollectionState():
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
             queue.extend(blocked_connections)
 
+    def _update_reachable_regions_incremental(self, player: int):
+        world: AutoWorld.World = self.multiworld.worlds[player]
+        reachable_regions = self.reachable_regions[player]
+        blocked_connections = self.blocked_connections[player]
+        blocked_by_item = self.blocked_connections_by_item[player]
+        unindexed_connections = self.unindexed_connections[player]
+        changed: Optional[Set[Optional[str]]] = getattr(self.prog_items[player], "changed", None)
+        start: Region = world.get_region(world.origin_region_name)
+
+        if start not in reachable_regions or changed is None or None in changed:
+            # no usable record of what changed, so every blocked connection has to be checked again
+            blocked_by_item.clear()
+            unindexed_connections.clear()
+            queue = deque(blocked_connections)
+            if start not in reachable_regions:
+                reachable_regions.add(start)
+                blocked_connections.update(start.exits)
+                queue.extend(start.exits)
+        else:
+            # only retry connections whose access rule read one of the changed items when it last failed
+            retry = unindexed_connections.copy()
+            unindexed_connections.clear()
+            for item_name in changed:
+                retry.update(blocked_by_item.pop(item_name, ()))
+            queue = deque(connection for connection in retry if connection in blocked_connections)
+        if changed:
+            changed.clear()
+
+        # run BFS on the connections to retry, indexing those still blocked by the items their access rules read
+        while queue:
+            connection = queue.popleft()
+            new_region = connection.connected_region
+            if new_region in reachable_regions:
+                blocked_connections.remove(connection)
+                continue
+            reads: Set[Tuple[int, Optional[str]]] = set()
+            if self.evaluate_recording_reads(connection.can_reach, reads):
+                if self.allow_partial_entrances and not new_region:
+                    unindexed_connections.add(connection)
+                    continue
+                assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
+                reachable_regions.add(new_region)
+                blocked_connections.remove(connection)
+                blocked_connections.update(new_region.exits)
+                queue.extend(new_region.exits)
+                self.path[new_region] = (new_region.name, self.path.get(connection, None))
+
+                # Retry connections if the new region can unblock them
+                for new_entrance in self.multiworld.indirect_connections.get(new_region, set()):
+                    if new_entrance in blocked_connections and new_entrance not in queue:
+                        queue.append(new_entrance)
+            elif all(read_player == player and item_name is not None for read_player, item_name in reads):
+                for _, item_name in reads:
+                    blocked_by_item.setdefault(item_name, set()).add(connection)
+            else:
+                # the rule read other players' items or the item counter as a whole, so it can't be indexed by name
+                unindexed_connections.add(connection)
+
+    def evaluate_recording_reads(self, rule: Callable[[CollectionState], bool], reads: Set[Tuple[int, Optional[str]]],
+                                 record_region_reads: bool = False) -> bool:
+        """
+        Evaluates rule, like an access rule, against this state, adding a (player, item name) pair to reads for each
+        prog_items lookup done while doing so, which includes those of the `has` and `count` families of methods.
+        Lookups that do not target a single item name, like iterating a player's items, are recorded with an item name
+        of None.
+
+        :param rule: The rule to evaluate.
+        :param reads: The set to add the read (player, item name) pairs to.
+        :param record_region_reads: If True, checking whether one of a player's regions is reachable also records that
+        player with an item name of None, since any of their items may change the result.
+        :return: The result of the rule.
+        """
+        prog_items = self.prog_items
+        reachable_regions = self.reachable_regions
+        self.prog_items = _ProgItemsReadRecorder(prog_items, reads)
+        if record_region_reads:
+            self.reachable_regions = _ReachableRegionsReadRecorder(reachable_regions, reads)
+        try:
+            return rule(self)
+        finally:
+            self.prog_items = prog_items
+            self.reachable_regions = reachable_regions
+
+    def _unshare_region_containers(self, player: int) -> None:
+        """Gives this state its own copies of player's region containers, which may be shared with copies of it."""
+        self.reachable_regions[player] = self.reachable_regions[player].copy()
+        self.blocked_connections[player] = self.blocked_connections[player].copy()
+        self.blocked_connections_by_item[player] = {item_name: entrance_set.copy() for item_name, entrance_set
+                                                    in self.blocked_connections_by_item[player].items()}
+        self.unindexed_connections[player] = self.unindexed_connections[player].copy()
+        self.exclusive_region_players.add(player)
+
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
-        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
-        ret.reachable_regions = {player: region_set.copy() for player, region_set in
-                                 self.reachable_regions.items()}
-        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
-                                   self.blocked_connections.items()}
+        """
+        Copies this state. The per-player containers are shared between both states until one of them needs to modify
+        them, so copying is cheap even for multiworlds with many players.
+        """
+        # skip __init__, so precollected items do not get collected into the copy only to be thrown away again
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        if isinstance(self.prog_items, _CopyOnAccessCounters):
+            shared = self.prog_items.share()
+        else:
+            # prog_items got replaced, for example by a plain dict in tests, so its Counters can't be shared safely
+            shared = {player: counter.copy() for player, counter in self.prog_items.items()}
+        ret.prog_items = _CopyOnAccessCounters(shared)
+        ret.reachable_regions = self.reachable_regions.copy()
+        ret.blocked_connections = self.blocked_connections.copy()
+        ret.blocked_connections_by_item = self.blocked_connections_by_item.copy()
+        ret.unindexed_connections = self.unindexed_connections.copy()
+        ret.exclusive_region_players = set()
+        self.exclusive_region_players = set()
         ret.advancements = self.advancements.copy()
         ret.path = self.path.copy()
         ret.locations_checked = self.locations_checked.copy()
+        ret.stale = {player: True for player in self.stale}
         ret.allow_partial_entrances = self.allow_partial_entrances
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
@@ -867,6 +1544,12 @@ class CollectionState():
         of a yield statement.
         """
         all_players = {player for player, _ in advancements_per_player}
+        # Unreachable locations of players whose world uses incremental_reachability are kept in `index` instead, and
+        # are only checked again once something they were found to depend on is modified while collecting items.
+        indexed_players = {player for player in all_players
+                           if self.multiworld.worlds[player].incremental_reachability}
+        index = _LocationReadIndex()
+        modified: Set[Tuple[int, Optional[str]]] = set()
         players_to_check = all_players
         # As an optimization, it is assumed that each player's world only logically depends on itself. However, worlds
         # are allowed to logically depend on other worlds, so once there are no more players that should be checked
@@ -886,14 +1569,19 @@ class CollectionState():
                 # stale whenever one of their own items is collected into the state.
                 reachable_locations: List[Location] = []
                 unreachable_locations: List[Location] = []
-                for location in locations:
-                    if location.can_reach(self):
-                        # Locations containing items that do not belong to `player` could be collected immediately
-                        # because they won't stale `player`'s region accessibility cache, but, for simplicity, all the
-                        # items at reachable locations are collected in a single loop.
-                        reachable_locations.append(location)
-                    else:
-                        unreachable_locations.append(location)
+                if player in indexed_players:
+                    for location in locations:
+                        if index.can_reach(self, location):
+                            reachable_locations.append(location)
+                else:
+                    for location in locations:
+                        if location.can_reach(self):
+                            # Locations containing items that do not belong to `player` could be collected immediately
+                            # because they won't stale `player`'s region accessibility cache, but, for simplicity, all
+                            # the items at reachable locations are collected in a single loop.
+                            reachable_locations.append(location)
+                        else:
+                            unreachable_locations.append(location)
                 if unreachable_locations:
                     next_advancements_per_player.append((player, unreachable_locations))
 
@@ -908,15 +1596,29 @@ class CollectionState():
                 # been processed.
                 next_players_to_check.discard(player)
 
-                # Collect the items from the reachable locations.
-                for advancement in reachable_locations:
-                    self.advancements.add(advancement)
-                    item = advancement.item
-                    assert isinstance(item, Item), "tried to collect advancement Location with no Item"
-                    if self.collect(item, True, advancement):
-                        # The player the item belongs to may be able to reach additional locations in the next sweep
-                        # iteration.
-                        next_players_to_check.add(item.player)
+                # Collect the items from the reachable locations, recording which items get modified if needed.
+                prog_items = self.prog_items
+                if indexed_players and reachable_locations:
+                    self.prog_items = _ProgItemsReadRecorder(prog_items, modified)
+                try:
+                    for advancement in reachable_locations:
+                        self.advancements.add(advancement)
+                        item = advancement.item
+                        assert isinstance(item, Item), "tried to collect advancement Location with no Item"
+                        if self.collect(item, True, advancement):
+                            # The player the item belongs to may be able to reach additional locations in the next
+                            # sweep iteration.
+                            next_players_to_check.add(item.player)
+                finally:
+                    self.prog_items = prog_items
+
+            if modified:
+                affected_per_player: Dict[int, List[Location]] = {}
+                for location in index.pop_affected(self, modified):
+                    affected_per_player.setdefault(location.player, []).append(location)
+                next_advancements_per_player += affected_per_player.items()
+                next_players_to_check.update(affected_per_player)
+                modified.clear()
 
             if not next_players_to_check:
                 if not checking_if_finished:
@@ -1689,8 +2391,14 @@ class Spoiler:
             self.entrances[(entrance, direction, player)] = \
                 {"player": player, "entrance": entrance, "exit": exit_, "direction": direction}
 
-    def create_playthrough(self, create_paths: bool = True) -> None:
-        """Destructive to the multiworld while it is run, damage gets repaired afterwards."""
+    def create_playthrough(self, create_paths: bool = True, time_limit: float = 0) -> None:
+        """
+        Destructive to the multiworld while it is run, damage gets repaired afterwards.
+
+        :param create_paths: Also calculate the paths to the locations of the playthrough.
+        :param time_limit: Seconds to spend on culling items that are not required from the playthrough, 0 for no limit.
+        Once exceeded, the items that were not checked yet are kept, so the playthrough stays valid but not minimal.
+        """
         from itertools import chain
         # get locations containing progress items
         multiworld = self.multiworld
@@ -1700,15 +2408,16 @@ class Spoiler:
         state = CollectionState(multiworld)
         sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
+        # build up spheres of collection radius.
+        # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
+        # The progress items of the spheres of get_spheres are those spheres, as other items don't change the logic.
+        search = multiworld.search_spheres(False, with_states=True)
+        search_spheres = iter(zip(search.spheres, search.states))
+        # only keep the states around for as long as they are needed
+        multiworld.drop_sphere_states(search)
         while sphere_candidates:
-
-            # build up spheres of collection radius.
-            # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
-
-            for location in sphere:
-                state.collect(location.item, True, location)
+            sphere, state = next(search_spheres, (set(), state))
+            sphere = {location for location in sphere_candidates if location in sphere}
 
             sphere_candidates -= sphere
             collection_spheres.append(sphere)
@@ -1731,22 +2440,10 @@ class Spoiler:
 
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
+        deadline = time.perf_counter() + time_limit if time_limit else None
         required_locations = {location for sphere in collection_spheres for location in sphere}
         for num, sphere in reversed(tuple(enumerate(collection_spheres))):
-            to_delete: Set[Location] = set()
-            for location in sphere:
-                # we remove the location from required_locations to sweep from, and check if the game is still beatable
-                logging.debug('Checking if %s (Player %d) is required to beat the game.', location.item.name,
-                              location.item.player)
-                required_locations.remove(location)
-                if multiworld.can_beat_game(state_cache[num], required_locations):
-                    to_delete.add(location)
-                else:
-                    # still required, got to keep it around
-                    required_locations.add(location)
-
-            # cull entries in spheres for spoiler walkthrough at end
-            sphere -= to_delete
+            self._cull_sphere(state_cache[num], sphere, required_locations, deadline)
 
         # second phase, sphere 0
         removed_precollected: List[Item] = []
@@ -1755,7 +2452,7 @@ class Spoiler:
             # The list of items is mutated by removing one item at a time to determine if each item is required to beat
             # the game, and re-adding that item if it was required, so a copy needs to be made before iterating.
             for item in precollected_items.copy():
-                if not item.advancement:
+                if not item.advancement or deadline and time.perf_counter() > deadline:
                     continue
                 logging.debug('Checking if %s (Player %d) is required to beat the game.', item.name, item.player)
                 precollected_items.remove(item)
@@ -1805,6 +2502,38 @@ class Spoiler:
         for item in removed_precollected:
             multiworld.push_precollected(item)
 
+    def _cull_sphere(self, state: Optional[CollectionState], sphere: Set[Location], required_locations: Set[Location],
+                     deadline: Optional[float]) -> None:
+        """
+        Removes the locations of sphere that are not required to beat the game from state, sweeping through
+        required_locations, from both sets.
+        Locations are checked in groups, growing the group after consecutive locations turned out not to be required and
+        going back to single locations once a group could not be removed, so spheres with few required locations take
+        few sweeps, while spheres with many still take about one sweep per location.
+        """
+        pending: Deque[Location] = deque(sorted(sphere))
+        removed_in_a_row = 0
+        while pending:
+            if deadline and time.perf_counter() > deadline:
+                logging.info("Ran out of time for culling the playthrough, keeping the remaining items.")
+                break
+            group = [pending.popleft() for _ in range(min(len(pending), max(removed_in_a_row, 1)))]
+            # we remove the group from required_locations to sweep from, and check if the game is still beatable
+            logging.debug('Checking if %s are required to beat the game.',
+                          [f"{location.item.name} (Player {location.item.player})" for location in group])
+            required_locations.difference_update(group)
+            if self.multiworld.can_beat_game(state, required_locations):
+                removed_in_a_row += len(group)
+            else:
+                # still required, got to keep it around, or check the locations of the group one by one
+                required_locations.update(group)
+                removed_in_a_row = 0
+                if len(group) > 1:
+                    pending.extendleft(reversed(group))
+
+        # cull entries in spheres for spoiler walkthrough at end
+        sphere &= required_locations
+
     def create_paths(self, state: CollectionState, collection_spheres: List[Set[Location]]) -> None:
         from itertools import zip_longest
         multiworld = self.multiworld
@@ -1,6 +1,7 @@
 import collections
 import itertools
 import logging
+import math
 import typing
 from collections import Counter, deque
 
@@ -59,6 +60,16 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     for item in item_pool:
         reachable_items.setdefault(item.player, deque()).append(item)
 
+    # The maximum exploration state is base_state with item_pool and unplaced_items collected and then swept. Collecting
+    # the whole pool again for every batch of items to place gets slow for large pools, so `pool_state` keeps the sweep
+    # of base_state on its own with the current item_pool collected on top, and is updated as items leave item_pool.
+    # Whatever base_state can sweep without any pool item stays collectable for the rest of the fill, so
+    # `base_sweep_state` only has to sweep again once one of the newly placed items is reachable. Both are rebuilt after
+    # a swap, because swaps take items out of locations that may have been swept already.
+    base_sweep_state: typing.Optional[CollectionState] = None
+    pool_state: typing.Optional[CollectionState] = None
+    new_placements: typing.List[Location] = []
+
     # for progress logging
     total = min(len(item_pool), len(locations))
     placed = 0
@@ -82,9 +93,23 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                     del item_pool[-p]
                     break
 
-        maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
-            if single_player_placement else None)
+        sweep_locations = multiworld.get_filled_locations(item.player) if single_player_placement else None
+        if base_sweep_state is None or pool_state is None:
+            base_sweep_state = sweep_from_pool(base_state, (), sweep_locations)
+            pool_state = base_sweep_state.copy()
+            for pool_item in item_pool:
+                pool_state.collect(pool_item, True)
+        else:
+            for item in items_to_place:
+                pool_state.remove(item)
+            if any(location.advancement and location.can_reach(base_sweep_state) for location in new_placements):
+                base_sweep_state.sweep_for_advancements(sweep_locations)
+                for location in base_sweep_state.advancements - pool_state.advancements:
+                    pool_state.advancements.add(location)
+                    pool_state.collect(location.item, True, location)
+        new_placements.clear()
+
+        maximum_exploration_state = sweep_from_pool(pool_state, unplaced_items, sweep_locations)
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
 
@@ -155,9 +180,16 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                                 break
                         else:
                             # No previous swap_state was usable as a base state to sweep from, so create a new one.
-                            swap_state = sweep_from_pool(base_state, [placed_item, *item_pool] if unsafe else item_pool,
-                                                         multiworld.get_filled_locations(item.player)
-                                                         if single_player_placement else None)
+                            # `pool_state` has item_pool collected already, unless a swap happened since it was built.
+                            if pool_state is not None and location not in pool_state.advancements:
+                                swap_state = sweep_from_pool(pool_state, (placed_item,) if unsafe else (),
+                                                             multiworld.get_filled_locations(item.player)
+                                                             if single_player_placement else None)
+                            else:
+                                swap_state = sweep_from_pool(base_state,
+                                                             [placed_item, *item_pool] if unsafe else item_pool,
+                                                             multiworld.get_filled_locations(item.player)
+                                                             if single_player_placement else None)
                             # Unsafe states should not be added to the cache because they have collected `placed_item`.
                             if not unsafe:
                                 if len(previous_safe_swap_state_cache) >= max_swap_base_state_cache_length:
@@ -180,6 +212,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                             reachable_items[placed_item.player].appendleft(
                                 placed_item)
                             item_pool.append(placed_item)
+                            base_sweep_state = pool_state = None
 
                             # cleanup at the end to hopefully get better errors
                             cleanup_required = True
@@ -200,6 +233,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             multiworld.push_item(spot_to_fill, item_to_place, False)
             spot_to_fill.locked = lock
             placements.append(spot_to_fill)
+            new_placements.append(spot_to_fill)
             placed += 1
             if not placed % 1000:
                 _log_fill_progress(name, placed, total)
@@ -730,6 +764,43 @@ def flood_items(multiworld: MultiWorld) -> None:
                 break
 
 
+def swept_prefix_states(base_state: CollectionState, locations: typing.Set[Location],
+                        items: typing.Sequence[Location]) -> typing.Iterator[CollectionState]:
+    """
+    Yields the states after collecting the items of the first len(items), len(items) - 1, ..., 0 of the locations into a
+    copy of base_state and sweeping the locations, each built on the sweep of the next shorter prefix.
+    Only about every sqrt(len(items))th state is kept until it gets yielded, the states in between are built again from
+    it once they are needed. The yielded states may be modified.
+    """
+    interval = math.isqrt(len(items)) + 1
+    checkpoints: typing.List[CollectionState] = []
+    segment: typing.List[CollectionState] = []
+    state = base_state.copy()
+    state.sweep_for_advancements(locations=locations)
+    for index in range(len(items) + 1):
+        if index:
+            state = state.copy()
+            state.collect(items[index - 1].item, True, items[index - 1])
+            state.sweep_for_advancements(locations=locations)
+        if index % interval == 0:
+            checkpoints.append(state)
+            segment = [state]
+        else:
+            segment.append(state)
+    checkpoints.pop()
+    yield from reversed(segment)
+    while checkpoints:
+        state = checkpoints.pop()
+        segment = [state]
+        start = len(checkpoints) * interval
+        for location in items[start:start + interval - 1]:
+            state = state.copy()
+            state.collect(location.item, True, location)
+            state.sweep_for_advancements(locations=locations)
+            segment.append(state)
+        yield from reversed(segment)
+
+
 def balance_multiworld_progression(multiworld: MultiWorld) -> None:
     # A system to reduce situations where players have no checks remaining, popularly known as "BK mode."
     # Overall progression balancing algorithm:
@@ -790,18 +861,18 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                 if not location.locked:
                     reachable_locations_count[location.player] += 1
 
-            logging.debug(f"Sphere {sphere_num}")
-            logging.debug(f"Reachable locations: {reachable_locations_count}")
-            debug_percentages = {
-                player: round(item_percentage(player, num), 2)
+            percentages = {
+                player: item_percentage(player, num)
                 for player, num in reachable_locations_count.items()
             }
+            logging.debug(f"Sphere {sphere_num}")
+            logging.debug(f"Reachable locations: {reachable_locations_count}")
+            debug_percentages = {player: round(percentage, 2) for player, percentage in percentages.items()}
             logging.debug(f"Reachable percentages: {debug_percentages}\n")
             sphere_num += 1
 
             if checked_locations:
-                max_percentage = max(map(lambda p: item_percentage(p, reachable_locations_count[p]),
-                                         reachable_locations_count))
+                max_percentage = max(percentages.values())
                 threshold_percentages = {
                     player: max_percentage * balanceable_players[player]
                     for player in balanceable_players
@@ -809,9 +880,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                 logging.debug(f"Thresholds: {threshold_percentages}")
                 balancing_players = {
                     player
-                    for player, reachables in reachable_locations_count.items()
-                    if (player in threshold_percentages
-                        and item_percentage(player, reachables) < threshold_percentages[player])
+                    for player, percentage in percentages.items()
+                    if player in threshold_percentages and percentage < threshold_percentages[player]
                 }
                 if balancing_players:
                     balancing_state = state.copy()
@@ -850,30 +920,35 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         if l not in balancing_unchecked_locations:
                             unlocked_locations[l.player].add(l)
                     items_to_replace: typing.List[Location] = []
+                    balancing_beats_game = multiworld.has_beaten_game(balancing_state)
                     for player in balancing_players:
                         locations_to_test = unlocked_locations[player]
                         items_to_test = list(candidate_items[player])
                         items_to_test.sort()
                         multiworld.random.shuffle(items_to_test)
+                        # Each test leaves out the last of the remaining items, so the items it collects are a prefix
+                        # of items_to_test, plus the items that were found to need replacing. Logic only ever gains
+                        # locations from more items, so sweep every prefix once, building on the shorter prefix, and
+                        # only sweep again in a test once it collects items that need replacing on top of it.
+                        prefix_states = swept_prefix_states(state, locations_to_test, items_to_test[:-1])
+                        replaced_items: typing.List[Location] = []
                         while items_to_test:
                             testing = items_to_test.pop()
-                            reducing_state = state.copy()
-                            for location in itertools.chain((
-                                    l for l in items_to_replace
-                                    if l.item.player == player
-                            ), items_to_test):
-                                reducing_state.collect(location.item, True, location)
-
-                            reducing_state.sweep_for_advancements(locations=locations_to_test)
+                            reducing_state = next(prefix_states)
+                            if replaced_items:
+                                for location in replaced_items:
+                                    reducing_state.collect(location.item, True, location)
+                                reducing_state.sweep_for_advancements(locations=locations_to_test)
 
-                            if multiworld.has_beaten_game(balancing_state):
+                            if balancing_beats_game:
                                 if not multiworld.has_beaten_game(reducing_state):
-                                    items_to_replace.append(testing)
+                                    replaced_items.append(testing)
                             else:
                                 reduced_sphere = get_sphere_locations(reducing_state, locations_to_test)
                                 p = item_percentage(player, reachable_locations_count[player] + len(reduced_sphere))
                                 if p < threshold_percentages[player]:
-                                    items_to_replace.append(testing)
+                                    replaced_items.append(testing)
+                        items_to_replace += replaced_items
 
                     old_moved_item_count = moved_item_count
 
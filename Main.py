@@ -73,7 +73,8 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     if not args.skip_output and not args.spoiler_only:
         AutoWorld.call_stage(multiworld, "assert_generate")
 
-    AutoWorld.call_all(multiworld, "generate_early")
+    parallel_workers = get_settings().generator.parallel_workers
+    AutoWorld.call_all_parallel(multiworld, "generate_early", parallel_workers)
 
     logger.info('')
 
@@ -109,13 +110,13 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         multiworld.worlds[1].options.local_items.value = set()
 
     logger.info('Creating MultiWorld.')
-    AutoWorld.call_all(multiworld, "create_regions")
+    AutoWorld.call_all_parallel(multiworld, "create_regions", parallel_workers)
 
     logger.info('Creating Items.')
-    AutoWorld.call_all(multiworld, "create_items")
+    AutoWorld.call_all_parallel(multiworld, "create_items", parallel_workers)
 
     logger.info('Calculating Access Rules.')
-    AutoWorld.call_all(multiworld, "set_rules")
+    AutoWorld.call_all_parallel(multiworld, "set_rules", parallel_workers)
 
     for player in multiworld.player_ids:
         exclusion_rules(multiworld, player, multiworld.worlds[player].options.exclude_locations.value)
@@ -220,7 +221,8 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     if args.spoiler_only:
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2,
+                                                  time_limit=get_settings().generator.playthrough_time_limit)
 
         multiworld.spoiler.to_file(output_path('%s_Spoiler.txt' % outfilebase))
         logger.info('Done. Skipped multidata modification. Total time: %s', time.perf_counter() - start)
@@ -371,7 +373,8 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2,
+                                                  time_limit=get_settings().generator.playthrough_time_limit)
 
         if args.spoiler:
             multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
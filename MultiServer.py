@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import bisect
 import collections
 import contextlib
 import copy
@@ -16,6 +17,7 @@ import operator
 import pickle
 import random
 import shlex
+import struct
 import threading
 import time
 import typing
@@ -41,7 +43,7 @@ except ImportError:
 
 import NetUtils
 import Utils
-from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text
+from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text, FuzzyIndex
 from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
     SlotType, LocationStore, MultiData, Hint, HintStatus
 from BaseClasses import ItemClassification
@@ -133,6 +135,20 @@ modify_functions = {
 }
 
 
+def merge_save_changes(save: typing.Dict[str, typing.Any], changes: typing.Dict[str, typing.Any]) -> None:
+    """Applies changes from the save journal, as returned by Context.get_save_changes, to save."""
+    for section, value in changes.items():
+        if section == "received_items":
+            for key, (start, items) in value.items():
+                received_items = save[section].setdefault(key, [])
+                del received_items[start:]
+                received_items.extend(items)
+        elif section in ("location_checks", "hints", "stored_data"):
+            save[section].update(value)
+        else:
+            save[section] = value
+
+
 def get_saving_second(seed_name: str, interval: int = 60) -> int:
     # save at expected times so other systems using savegame can expect it
     # represents the target second of the auto_save_interval at which to save
@@ -212,9 +228,150 @@ class Client(Endpoint):
 team_slot = typing.Tuple[int, int]
 
 
+class DurationHistogram:
+    """Counts durations in buckets of exponentially growing size."""
+    bounds: typing.ClassVar[typing.Tuple[float, ...]] = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                                                          0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    """ upper bounds of the buckets in seconds, the last bucket has no upper bound """
+    __slots__ = ("counts", "count", "total", "maximum")
+
+    counts: typing.List[int]
+    count: int
+    total: float
+    maximum: float
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, duration: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, duration)] += 1
+        self.count += 1
+        self.total += duration
+        self.maximum = max(self.maximum, duration)
+
+    def get_quantile(self, quantile: float) -> float:
+        """Upper bound of the bucket the quantile falls into, capped by the longest duration."""
+        target = quantile * self.count
+        counted = 0
+        for bound, count in zip(self.bounds, self.counts):
+            counted += count
+            if counted >= target:
+                return min(bound, self.maximum)
+        return self.maximum
+
+    def format(self) -> str:
+        return (f"{self.count} times, p50 <= {self.get_quantile(0.5) * 1000:.2f} ms, "
+                f"p99 <= {self.get_quantile(0.99) * 1000:.2f} ms, max {self.maximum * 1000:.2f} ms")
+
+
+class ServerMetrics:
+    """Counters and durations of the hot paths of a server, for the /metrics command and the metrics endpoint."""
+    command_limit: typing.ClassVar[int] = 64
+    """ commands are named by clients, so only this many different ones are recorded """
+
+    def __init__(self) -> None:
+        self.start_time = time.monotonic()
+        self.commands: typing.Dict[str, DurationHistogram] = {}
+        self.sent_frames = 0
+        self.sent_bytes = 0
+        self.largest_frame = 0
+        self.broadcast_queue_endpoints = 0
+        self.broadcast_queue_messages = 0
+        self.largest_broadcast_queue = 0
+        self.saves = DurationHistogram()
+        self.event_loop_lag = DurationHistogram()
+
+    def add_command(self, cmd: typing.Any, duration: float) -> None:
+        histogram = self.commands.get(cmd) if type(cmd) is str else None
+        if histogram is None:
+            if type(cmd) is not str or len(self.commands) >= self.command_limit:
+                cmd = "(other)"
+            histogram = self.commands.setdefault(cmd, DurationHistogram())
+        histogram.add(duration)
+
+    def add_sent(self, msg: str, endpoints: int = 1) -> None:
+        # bytes of the UTF-8 encoded frame; ASCII, the usual case, needs no encoding to measure
+        size = len(msg) if msg.isascii() else len(msg.encode())
+        self.sent_frames += endpoints
+        self.sent_bytes += size * endpoints
+        self.largest_frame = max(self.largest_frame, size)
+
+    def set_broadcast_queue(self, endpoints: int, messages: int) -> None:
+        self.broadcast_queue_endpoints = endpoints
+        self.broadcast_queue_messages = messages
+        self.largest_broadcast_queue = max(self.largest_broadcast_queue, messages)
+
+    @contextlib.contextmanager
+    def time_save(self) -> typing.Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.saves.add(time.perf_counter() - start)
+
+    async def monitor_event_loop_lag(self, interval: float = 1.0) -> None:
+        """Record how late the event loop wakes up from sleeping, which is how long other tasks blocked it."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.event_loop_lag.add(max(0.0, loop.time() - start - interval))
+
+    def get_summary(self, connections: int) -> typing.List[str]:
+        lines = [f"Uptime {time.monotonic() - self.start_time:.0f} s, {connections} connections, "
+                 f"sent {Utils.format_SI_prefix(self.sent_bytes, 1024)}B in {self.sent_frames} frames, "
+                 f"largest {Utils.format_SI_prefix(self.largest_frame, 1024)}B",
+                 f"Broadcast queue: {self.broadcast_queue_messages} messages for {self.broadcast_queue_endpoints} "
+                 f"clients, largest {self.largest_broadcast_queue} messages",
+                 f"Saves: {self.saves.format()}",
+                 f"Event loop lag: {self.event_loop_lag.format()}"]
+        lines.extend(f"{cmd}: {histogram.format()}" for cmd, histogram in sorted(self.commands.items()))
+        return lines
+
+    def get_prometheus_text(self, connections: int) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def add_histogram(name: str, histogram: DurationHistogram, labels: str = "") -> None:
+            counted = 0
+            for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+                counted += count
+                lines.append(f'{name}_bucket{{{labels}le="{"+Inf" if bound == float("inf") else bound}"}} {counted}')
+            label_set = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{name}_sum{label_set} {histogram.total}")
+            lines.append(f"{name}_count{label_set} {histogram.count}")
+
+        lines.append("# TYPE archipelago_command_duration_seconds histogram")
+        for cmd, histogram in sorted(self.commands.items()):
+            cmd = cmd.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            add_histogram("archipelago_command_duration_seconds", histogram, f'cmd="{cmd}",')
+        lines.append("# TYPE archipelago_save_duration_seconds histogram")
+        add_histogram("archipelago_save_duration_seconds", self.saves)
+        lines.append("# TYPE archipelago_event_loop_lag_seconds histogram")
+        add_histogram("archipelago_event_loop_lag_seconds", self.event_loop_lag)
+        for name, metric_type, value in (
+                ("archipelago_uptime_seconds", "gauge", time.monotonic() - self.start_time),
+                ("archipelago_connections", "gauge", connections),
+                ("archipelago_sent_frames_total", "counter", self.sent_frames),
+                ("archipelago_sent_bytes_total", "counter", self.sent_bytes),
+                ("archipelago_largest_frame_bytes", "gauge", self.largest_frame),
+                ("archipelago_broadcast_queue_endpoints", "gauge", self.broadcast_queue_endpoints),
+                ("archipelago_broadcast_queue_messages", "gauge", self.broadcast_queue_messages),
+                ("archipelago_largest_broadcast_queue_messages", "gauge", self.largest_broadcast_queue)):
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
 class Context:
     dumper = staticmethod(encode)
     loader = staticmethod(decode)
+    encoded_data_package_limit = 32
+    broadcast_write_buffer_limit = 1 << 16  # bytes, same as the default write limit of websockets
+    broadcast_retry_delay = 0.1  # seconds until broadcasts held back for a full write buffer are retried
 
     simple_options = {"hint_cost": int,
                       "location_check_points": int,
@@ -244,8 +401,8 @@ class Context:
     item_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
     location_names: typing.Dict[str, typing.Dict[int, str]]
     location_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
-    all_item_and_group_names: typing.Dict[str, typing.Set[str]]
-    all_location_and_group_names: typing.Dict[str, typing.Set[str]]
+    all_item_and_group_names: typing.Dict[str, FuzzyIndex]
+    all_location_and_group_names: typing.Dict[str, FuzzyIndex]
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
     spheres: typing.List[typing.Dict[int, typing.Set[int]]]
     """ each sphere is { player: { location_id, ... } } """
@@ -259,6 +416,7 @@ class Context:
         super(Context, self).__init__()
         self.slot_info = {}
         self.log_network = log_network
+        self.metrics = ServerMetrics()
         self.endpoints = []
         self.clients = {}
         self.compatibility: int = compatibility
@@ -266,6 +424,14 @@ class Context:
         self.data_filename = None
         self.save_filename = None
         self.saving = False
+        self.save_lock = threading.Lock()
+        self.save_journal_id = 0
+        self.save_journal_size = 0
+        self.snapshot_size = 0
+        self.saved_state: typing.Optional[typing.Dict[str, typing.Any]] = None
+        self.unsaved_stored_data: typing.Set[str] = set()
+        self.unsaved_location_checks: typing.Set[team_slot] = set()
+        self.unsaved_hints: typing.Set[team_slot] = set()
         self.player_names: typing.Dict[team_slot, str] = {}
         self.player_name_lookup: typing.Dict[str, team_slot] = {}
         self.connect_names = {}  # names of slots clients can connect to
@@ -277,6 +443,7 @@ class Context:
         self.server = None
         self.countdown_timer = 0
         self.received_items = {}
+        self.pending_items: typing.Set[team_slot] = set()  # slots that received items not yet sent to their clients
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
         self.location_checks = collections.defaultdict(set)
@@ -284,6 +451,9 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        # (team, finding_player) -> location -> hints that may still change once that location gets checked
+        self.unfound_hints: typing.Dict[team_slot, typing.Dict[int, typing.Set[Hint]]] = \
+            collections.defaultdict(dict)
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -312,12 +482,18 @@ class Context:
         self.random = random.Random()
         self.stored_data = {}
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
+        # endpoint -> (id, encoded message) of broadcasts that are not sent yet
+        self.pending_broadcasts: typing.Dict[Endpoint, typing.List[typing.Tuple[int, str]]] = {}
+        self.broadcast_ids = itertools.count()
+        self.broadcast_flush_handle: typing.Optional[asyncio.Handle] = None
+        self.broadcast_retry_handle: typing.Optional[asyncio.TimerHandle] = None
         self.read_data = {}
         self.spheres = []
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
         self.checksums = {}
+        self.encoded_data_packages: typing.Dict[typing.FrozenSet[str], str] = {}
         self.item_name_groups = {}
         self.location_name_groups = {}
         self.all_item_and_group_names = {}
@@ -347,7 +523,9 @@ class Context:
             del game_package["item_name_groups"]
             del game_package["location_name_groups"]
 
-    def _init_game_data(self):
+    def init_game_data(self):
+        """Builds the name lookups from the data packages in gamespackage."""
+        self.encoded_data_packages.clear()
         for game_name, game_package in self.gamespackage.items():
             if "checksum" in game_package:
                 self.checksums[game_name] = game_package["checksum"]
@@ -356,9 +534,9 @@ class Context:
             for location_name, location_id in game_package["location_name_to_id"].items():
                 self.location_names[game_name][location_id] = location_name
             self.all_item_and_group_names[game_name] = \
-                set(game_package["item_name_to_id"]) | set(self.item_name_groups[game_name])
+                FuzzyIndex(set(game_package["item_name_to_id"]) | set(self.item_name_groups[game_name]))
             self.all_location_and_group_names[game_name] = \
-                set(game_package["location_name_to_id"]) | set(self.location_name_groups.get(game_name, []))
+                FuzzyIndex(set(game_package["location_name_to_id"]) | set(self.location_name_groups.get(game_name, [])))
 
         archipelago_item_names = self.item_names["Archipelago"]
         archipelago_location_names = self.location_names["Archipelago"]
@@ -373,10 +551,26 @@ class Context:
     def location_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["location_name_to_id"] if game in self.gamespackage else None
 
+    def get_encoded_data_package(self, games: typing.FrozenSet[str]) -> str:
+        """
+        Returns the encoded DataPackage message for the data packages of games. The data packages don't change after
+        loading, so the messages are cached for the sets of games that get requested the most recently.
+        """
+        encoded = self.encoded_data_packages.pop(games, None)
+        if encoded is None:
+            encoded = self.dumper([{"cmd": "DataPackage", "data": {"games": {
+                name: game_data for name, game_data in self.gamespackage.items() if name in games}}}])
+            if len(self.encoded_data_packages) >= self.encoded_data_package_limit:
+                del self.encoded_data_packages[next(iter(self.encoded_data_packages))]
+        self.encoded_data_packages[games] = encoded
+        return encoded
+
     # General networking
-    async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
+    async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[typing.Dict[str, typing.Any]]) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
+        if endpoint in self.pending_broadcasts:
+            self.flush_broadcasts(endpoint)  # keep the order messages were sent in
         msg = self.dumper(msgs)
         try:
             await endpoint.socket.send(msg)
@@ -385,6 +579,7 @@ class Context:
             await self.disconnect(endpoint)
             return False
         else:
+            self.metrics.add_sent(msg)
             if self.log_network:
                 self.logger.info(f"Outgoing message: {msg}")
             return True
@@ -392,6 +587,8 @@ class Context:
     async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
+        if endpoint in self.pending_broadcasts:
+            self.flush_broadcasts(endpoint)  # keep the order messages were sent in
         try:
             await endpoint.socket.send(msg)
         except websockets.ConnectionClosed:
@@ -399,6 +596,7 @@ class Context:
             await self.disconnect(endpoint)
             return False
         else:
+            self.metrics.add_sent(msg)
             if self.log_network:
                 self.logger.info(f"Outgoing message: {msg}")
             return True
@@ -414,11 +612,70 @@ class Context:
             self.logger.exception("Exception during broadcast_send_encoded_msgs")
             return False
         else:
+            self.metrics.add_sent(msg, len(sockets))
             if self.log_network:
                 self.logger.info(f"Outgoing broadcast: {msg}")
             return True
 
-    def broadcast_all(self, msgs: typing.List[dict]):
+    def queue_broadcast(self, endpoints: typing.Iterable[Endpoint], msg: str) -> None:
+        """
+        Queue an encoded message to be sent to endpoints. Messages queued for an endpoint in the same tick of the event
+        loop get sent as one frame by flush_broadcasts, which is encoded once for all endpoints with the same messages.
+        """
+        broadcast = (next(self.broadcast_ids), msg)
+        for endpoint in endpoints:
+            self.pending_broadcasts.setdefault(endpoint, []).append(broadcast)
+        if self.pending_broadcasts and not self.broadcast_flush_handle:
+            self.broadcast_flush_handle = asyncio.get_running_loop().call_soon(self.flush_broadcasts)
+
+    def flush_broadcasts(self, *forced_endpoints: Endpoint) -> None:
+        """
+        Send queued broadcasts. Endpoints with a full write buffer are held back and retried later,
+        unless they are in forced_endpoints.
+        """
+        if self.broadcast_flush_handle:
+            self.broadcast_flush_handle.cancel()
+            self.broadcast_flush_handle = None
+        held_back: typing.Dict[Endpoint, typing.List[typing.Tuple[int, str]]] = {}
+        frames: typing.Dict[typing.Tuple[int, ...], typing.Tuple[typing.List[str], typing.List[ServerConnection]]] = {}
+        for endpoint, broadcasts in self.pending_broadcasts.items():
+            socket = endpoint.socket
+            if not socket or not socket.open:
+                continue
+            transport = socket.transport
+            if transport and endpoint not in forced_endpoints and \
+                    transport.get_write_buffer_size() > self.broadcast_write_buffer_limit:
+                held_back[endpoint] = broadcasts
+                continue
+            key = tuple(broadcast_id for broadcast_id, _ in broadcasts)  # endpoints with the same key share a frame
+            if key in frames:
+                frames[key][1].append(socket)
+            else:
+                frames[key] = [msg for _, msg in broadcasts], [socket]
+        self.pending_broadcasts = held_back
+        self.metrics.set_broadcast_queue(len(held_back) + sum(len(sockets) for _, sockets in frames.values()),
+                                         sum(len(broadcasts) for broadcasts in self.pending_broadcasts.values()) +
+                                         sum(len(msgs) * len(sockets) for msgs, sockets in frames.values()))
+        if held_back and not self.broadcast_retry_handle:
+            self.broadcast_retry_handle = asyncio.get_running_loop().call_later(self.broadcast_retry_delay,
+                                                                               self._retry_broadcasts)
+        for msgs, sockets in frames.values():
+            # join the encoded lists of messages into one list
+            msg = msgs[0] if len(msgs) == 1 else "[" + ",".join(msg[1:-1] for msg in msgs if msg != "[]") + "]"
+            try:
+                websockets.broadcast(sockets, msg)
+            except RuntimeError:
+                self.logger.exception("Exception during flush_broadcasts")
+            else:
+                self.metrics.add_sent(msg, len(sockets))
+                if self.log_network:
+                    self.logger.info(f"Outgoing broadcast: {msg}")
+
+    def _retry_broadcasts(self) -> None:
+        self.broadcast_retry_handle = None
+        self.flush_broadcasts()
+
+    def broadcast_all(self, msgs: typing.List[typing.Dict[str, typing.Any]]):
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
         data = self.dumper(msgs)
         endpoints = (
@@ -426,13 +683,13 @@ class Context:
             for endpoint in self.endpoints
             if endpoint.auth and not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self.queue_broadcast(endpoints, data)
 
-    def broadcast_text_all(self, text: str, additional_arguments: dict = {}):
+    def broadcast_text_all(self, text: str, additional_arguments: typing.Dict[str, typing.Any] = {}):
         self.logger.info("Notice (all): %s" % text)
         self.broadcast_all([{**{"cmd": "PrintJSON", "data": [{ "text": text }]}, **additional_arguments}])
 
-    def broadcast_team(self, team: int, msgs: typing.List[dict]):
+    def broadcast_team(self, team: int, msgs: typing.List[typing.Dict[str, typing.Any]]):
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
         data = self.dumper(msgs)
         endpoints = (
@@ -440,13 +697,14 @@ class Context:
             for endpoint in itertools.chain.from_iterable(self.clients[team].values())
             if not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self.queue_broadcast(endpoints, data)
 
-    def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]):
+    def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[typing.Dict[str, typing.Any]]):
         msgs = self.dumper(msgs)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        self.queue_broadcast(endpoints, msgs)
 
     async def disconnect(self, endpoint: Client):
+        self.pending_broadcasts.pop(endpoint, None)
         if endpoint in self.endpoints:
             self.endpoints.remove(endpoint)
         if endpoint.slot and endpoint in self.clients[endpoint.team][endpoint.slot]:
@@ -546,6 +804,8 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+            for hint in hints:
+                self.index_hint(0, hint)
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -568,7 +828,7 @@ class Context:
                 self.location_name_groups[game_name] = data["location_name_groups"]
                 del data["location_name_groups"]
             del data["item_name_groups"]  # remove from data package, but keep in self.item_name_groups
-        self._init_game_data()
+        self.init_game_data()
         for game_name, data in self.item_name_groups.items():
             self.read_data[f"item_name_groups_{game_name}"] = lambda lgame=game_name: self.item_name_groups[lgame]
         for game_name, data in self.location_name_groups.items():
@@ -583,7 +843,8 @@ class Context:
         if self.saving:
             if now:
                 self.save_dirty = False
-                return self._save()
+                with self.metrics.time_save():
+                    return self._save()
 
             self.save_dirty = True
             return True
@@ -591,17 +852,117 @@ class Context:
         return False
 
     def _save(self, exit_save: bool = False) -> bool:
+        """
+        Appends the changes since the last save to the save journal, or writes a full snapshot and starts a new
+        journal once the journal got bigger than the snapshot, and on exit.
+        """
         try:
-            # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            with self.save_lock:
+                if exit_save or self.saved_state is None or self.save_journal_size > self.snapshot_size:
+                    self._save_snapshot()
+                else:
+                    self._save_journal_entry(self.get_save_changes())
         except Exception as e:
             self.logger.exception(e)
             return False
         else:
             return True
 
+    @property
+    def save_journal_filename(self) -> str:
+        return self.save_filename + ".journal"
+
+    def _save_snapshot(self) -> None:
+        # keys marked while the snapshot is taken are saved again with the next journal entry
+        self.unsaved_stored_data, self.unsaved_location_checks, self.unsaved_hints = set(), set(), set()
+        save = self.get_save()
+        save["journal_id"] = self.save_journal_id + 1
+        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+        encoded_save = zlib.compress(pickle.dumps(save))
+        with open(self.save_filename, "wb") as f:
+            f.write(encoded_save)
+        self.save_journal_id += 1
+        self.snapshot_size = len(encoded_save)
+        # the journal starts with the id of the snapshot it applies to, so an outdated journal is never replayed
+        with open(self.save_journal_filename, "wb") as f:
+            self.save_journal_size = f.write(self._encode_journal_entry(self.save_journal_id))
+        self._set_saved_state(save)
+
+    def _save_journal_entry(self, changes: typing.Dict[str, typing.Any]) -> None:
+        if changes:
+            with open(self.save_journal_filename, "ab") as f:
+                self.save_journal_size += f.write(self._encode_journal_entry(changes))
+
+    @staticmethod
+    def _encode_journal_entry(entry: object) -> bytes:
+        data = zlib.compress(pickle.dumps(entry))
+        return struct.pack("<I", len(data)) + data
+
+    def _set_saved_state(self, save: typing.Dict[str, typing.Any]) -> None:
+        """Remembers what save contains, for get_save_changes to compare against."""
+        saved_state = {section: copy.deepcopy(value) for section, value in save.items()
+                       if section not in ("received_items", "location_checks", "hints", "stored_data")}
+        saved_state["received_items"] = {key: len(items) for key, items in save["received_items"].items()}
+        self.saved_state = saved_state
+
+    def get_save_changes(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns the parts of get_save that changed since the last save, in the format merge_save_changes applies them.
+        Received items are appended to, so only the new items get returned for them. Checked locations, hints and
+        data storage are returned for the keys that were marked as unsaved, the small sections of get_save_state are
+        compared to the last save and returned as a whole.
+        """
+        self.recheck_hints()
+        saved_state = self.saved_state
+        changes: typing.Dict[str, typing.Any] = {}
+        saved_lengths: typing.Dict[typing.Tuple[int, int, bool], int] = saved_state["received_items"]
+        received_items = {key: (saved_lengths.get(key, 0), items[saved_lengths.get(key, 0):])
+                          for key, items in self.received_items.items() if len(items) > saved_lengths.get(key, 0)}
+        if received_items:
+            changes["received_items"] = received_items
+            saved_lengths.update((key, start + len(items)) for key, (start, items) in received_items.items())
+        # the event loop keeps marking keys while this runs on the saving thread, so the marked keys are swapped out
+        # before their values are read, and keys marked meanwhile are saved with the next entry
+        location_check_keys, self.unsaved_location_checks = self.unsaved_location_checks, set()
+        hint_keys, self.unsaved_hints = self.unsaved_hints, set()
+        stored_data_keys, self.unsaved_stored_data = self.unsaved_stored_data, set()
+        if location_check_keys:
+            changes["location_checks"] = {key: set(self.location_checks[key]) for key in location_check_keys}
+        if hint_keys:
+            changes["hints"] = {key: set(self.hints[key]) for key in hint_keys}
+        if stored_data_keys:
+            changes["stored_data"] = {key: self.stored_data[key] for key in stored_data_keys}
+        for section, value in self.get_save_state().items():
+            if value != saved_state.get(section):
+                changes[section] = value
+                saved_state[section] = copy.deepcopy(value)
+        return changes
+
+    def read_save(self) -> typing.Dict[str, typing.Any]:
+        """Reads the save snapshot and applies the changes of its journal to it."""
+        with open(self.save_filename, 'rb') as f:
+            encoded_save = f.read()
+        save_data = restricted_loads(zlib.decompress(encoded_save))
+        self.save_journal_id = save_data.get("journal_id", 0)
+        try:
+            with open(self.save_journal_filename, 'rb') as f:
+                journal = f.read()
+        except FileNotFoundError:
+            return save_data
+        entries: typing.List[typing.Any] = []
+        position = 0
+        while position + 4 <= len(journal):
+            size, = struct.unpack_from("<I", journal, position)
+            if position + 4 + size > len(journal):
+                self.logger.warning("Save journal ends in an incomplete entry, which gets ignored.")
+                break
+            entries.append(restricted_loads(zlib.decompress(journal[position + 4:position + 4 + size])))
+            position += 4 + size
+        if entries and entries[0] == self.save_journal_id:
+            for changes in entries[1:]:
+                merge_save_changes(save_data, changes)
+        return save_data
+
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
@@ -611,9 +972,7 @@ class Context:
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
             try:
-                with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                self.set_save(self.read_save())
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
@@ -635,7 +994,8 @@ class Context:
                         time.sleep(max(1.0, next_wakeup))
                         if self.save_dirty:
                             self.logger.debug("Saving via thread.")
-                            self._save()
+                            with self.metrics.time_save():
+                                self._save()
                     except OperationalError as e:
                         self.logger.exception(e)
                         self.logger.info(f"Saving failed. Retry in {self.auto_save_interval} seconds.")
@@ -651,15 +1011,23 @@ class Context:
                 import atexit
                 atexit.register(self._save, True)  # make sure we save on exit too
 
-    def get_save(self) -> dict:
+    def get_save(self) -> typing.Dict[str, typing.Any]:
         self.recheck_hints()
-        d = {
-            "version": self.save_version,
-            "connect_names": self.connect_names,
+        d = self.get_save_state()
+        d.update({
             "received_items": self.received_items,
-            "hints_used": dict(self.hints_used),
             "hints": dict(self.hints),
             "location_checks": dict(self.location_checks),
+            "stored_data": self.stored_data,
+        })
+        return d
+
+    def get_save_state(self) -> typing.Dict[str, typing.Any]:
+        """Returns the sections of get_save that are small enough to be compared as a whole to find changes."""
+        return {
+            "version": self.save_version,
+            "connect_names": self.connect_names,
+            "hints_used": dict(self.hints_used),
             "name_aliases": self.name_aliases,
             "client_game_state": dict(self.client_game_state),
             "client_activity_timers": tuple(
@@ -668,19 +1036,15 @@ class Context:
                 (key, value.timestamp()) for key, value in self.client_connection_timers.items()),
             "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
-            "stored_data": self.stored_data,
             "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
                              "server_password": self.server_password, "password": self.password,
                              "release_mode": self.release_mode,
                              "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
                              "countdown_mode": self.countdown_mode,
                              "item_cheat": self.item_cheat, "compatibility": self.compatibility}
-
         }
 
-        return d
-
-    def set_save(self, savedata: dict):
+    def set_save(self, savedata: typing.Dict[str, typing.Any]):
         if self.connect_names != savedata["connect_names"]:
             raise Exception("This savegame does not appear to match the loaded multiworld.")
         if savedata["version"] > self.save_version:
@@ -688,6 +1052,10 @@ class Context:
         self.received_items = savedata["received_items"]
         self.hints_used.update(savedata["hints_used"])
         self.hints.update(savedata["hints"])
+        self.unfound_hints.clear()
+        for (team, _), hints in self.hints.items():
+            for hint in hints:
+                self.index_hint(team, hint)
 
         self.name_aliases.update(savedata["name_aliases"])
         self.client_game_state.update(savedata["client_game_state"])
@@ -698,6 +1066,9 @@ class Context:
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
              in savedata["client_activity_timers"]})
         self.location_checks.update(savedata["location_checks"])
+        for (team, slot), locations in savedata["location_checks"].items():
+            if slot in self.locations:  # saves of older multidata may have checks of slots without locations
+                self.locations.mark_checked(team, slot, locations)
         self.random.setstate(savedata["random_state"])
 
         if "game_options" in savedata:
@@ -730,28 +1101,35 @@ class Context:
         return 0
 
     def recheck_hints(self, team: typing.Optional[int] = None, slot: typing.Optional[int] = None,
-                      changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
-        """Refreshes the hints for the specified team/slot. Providing 'None' for either team or slot
-        will refresh all teams or all slots respectively. If a set is passed for 'changed', each (team,slot)
-        pair that has at least one hint modified will be added to the set.
+                      changed: typing.Optional[typing.Set[team_slot]] = None,
+                      locations: typing.Optional[typing.Iterable[int]] = None) -> None:
+        """Refreshes the hints found by the specified team/slot. Providing 'None' for either team or slot
+        will refresh all teams or all slots respectively. If locations are passed, only hints for those locations
+        are refreshed. If a set is passed for 'changed', each (team,slot) pair that has at least one hint modified
+        will be added to the set.
         """
-        for hint_team, hint_slot in self.hints:
-            if team != hint_team and team is not None:
-                continue  # Check specified team only, all if team is None
-            if slot != hint_slot and slot is not None:
-                continue  # Check specified slot only, all if slot is None
-            new_hints: typing.Set[Hint] = set()
-            for hint in self.hints[hint_team, hint_slot]:
-                new_hint = hint.re_check(self, hint_team)
-                new_hints.add(new_hint)
-                if hint == new_hint:
-                    continue
-                for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
-                    if changed is not None:
-                        changed.add((hint_team,player))
-                    if slot is not None and slot != player:
+        if team is not None and slot is not None:
+            finders: typing.Iterable[team_slot] = ((team, slot),) if (team, slot) in self.unfound_hints else ()
+        else:
+            finders = [(hint_team, hint_slot) for hint_team, hint_slot in self.unfound_hints
+                       if (team is None or team == hint_team) and (slot is None or slot == hint_slot)]
+        for hint_team, finding_player in finders:
+            location_hints = self.unfound_hints[hint_team, finding_player]
+            checked = self.location_checks[hint_team, finding_player]
+            if locations is None:
+                found_locations = checked.intersection(location_hints)
+            else:
+                found_locations = [location for location in locations
+                                   if location in location_hints and location in checked]
+            for location in found_locations:
+                for hint in location_hints.pop(location):
+                    new_hint = hint.re_check(self, hint_team)
+                    if hint == new_hint:
+                        continue
+                    for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
+                        if changed is not None:
+                            changed.add((hint_team, player))
                         self.replace_hint(hint_team, player, hint, new_hint)
-            self.hints[hint_team, hint_slot] = new_hints
 
     def get_rechecked_hints(self, team: int, slot: int):
         self.recheck_hints(team, slot)
@@ -823,9 +1201,12 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.unsaved_hints.add((team, hint.finding_player))
+                    self.index_hint(team, hint)
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
+                        self.unsaved_hints.add((team, player))
                         new_hint_events.add(player)
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
@@ -850,6 +1231,16 @@ class Context:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
             self.hints[team, slot].add(new_hint)
+            self.unsaved_hints.add((team, slot))
+            location_hints = self.unfound_hints[team, old_hint.finding_player].get(old_hint.location)
+            if location_hints and old_hint in location_hints:
+                location_hints.remove(old_hint)
+                self.index_hint(team, new_hint)
+
+    def index_hint(self, team: int, hint: Hint) -> None:
+        """Remember a stored hint by its location, so it gets rechecked when that location is checked."""
+        if not (hint.found and hint.status == HintStatus.HINT_FOUND):
+            self.unfound_hints[team, hint.finding_player].setdefault(hint.location, set()).add(hint)
     
     # "events"
 
@@ -906,7 +1297,12 @@ async def server(websocket: "ServerConnection", path: str = "/", ctx: Context =
             if ctx.log_network:
                 ctx.logger.info(f"Incoming message: {data}")
             for msg in decode(data):
-                await process_client_cmd(ctx, client, msg)
+                start = time.perf_counter()
+                try:
+                    await process_client_cmd(ctx, client, msg)
+                finally:
+                    ctx.metrics.add_command(msg.get("cmd") if isinstance(msg, dict) else None,
+                                            time.perf_counter() - start)
     except Exception as e:
         if not isinstance(e, websockets.WebSocketException):
             ctx.logger.exception(e)
@@ -937,8 +1333,7 @@ async def on_client_connected(ctx: Context, client: Client):
         'permissions': get_permissions(ctx),
         'hint_cost': ctx.hint_cost,
         'location_check_points': ctx.location_check_points,
-        'datapackage_checksums': {game: game_data["checksum"] for game, game_data
-                                  in ctx.gamespackage.items() if game in games and "checksum" in game_data},
+        'datapackage_checksums': {game: ctx.checksums[game] for game in games if game in ctx.checksums},
         'seed_name': ctx.seed_name,
         'time': time.time(),
     }])
@@ -1072,20 +1467,23 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    """Sends the items received since the last call to the clients of the slots that received them."""
+    pending_items = ctx.pending_items
+    ctx.pending_items = set()
+    for team, slot in pending_items:
+        for client in ctx.clients.get(team, {}).get(slot, ()):
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, client.remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                # queued like broadcasts, so the client gets them in order with the messages about the same checks
+                ctx.broadcast((client,), [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items[first_new_item:]}])
+                client.send_index = len(start_inventory) + len(items)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1124,11 +1522,12 @@ def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
 
 
 def get_remaining(ctx: Context, team: int, slot: int) -> typing.List[typing.Tuple[int, int]]:
-    return ctx.locations.get_remaining(ctx.location_checks, team, slot)
+    return ctx.locations.get_remaining(None, team, slot)
 
 
 def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem):
     for target in ctx.slot_set(target_slot):
+        ctx.pending_items.add((team, target))
         for item in items:
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
@@ -1170,6 +1569,8 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
         del sortable
 
         ctx.location_checks[team, slot] |= new_locations
+        ctx.unsaved_location_checks.add((team, slot))
+        ctx.locations.mark_checked(team, slot, new_locations)
         send_new_items(ctx)
         ctx.broadcast(ctx.clients[team][slot], [{
             "cmd": "RoomUpdate",
@@ -1177,7 +1578,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             "checked_locations": new_locations,  # send back new checks only
         }])
         updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
+        ctx.recheck_hints(team, slot, updated_slots, new_locations)
         for hint_team, hint_slot in updated_slots:
             ctx.on_changed_hints(hint_team, hint_slot)
         ctx.save()
@@ -1669,6 +2070,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.pending_items.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1689,6 +2091,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
             hints = {hint.re_check(self.ctx, self.client.team) for hint in
                      self.ctx.hints[self.client.team, self.client.slot]}
             self.ctx.hints[self.client.team, self.client.slot] = hints
+            self.ctx.unsaved_hints.add((self.client.team, self.client.slot))
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1829,11 +2232,11 @@ class ClientMessageProcessor(CommonCommandProcessor):
 
 
 def get_checked_checks(ctx: Context, team: int, slot: int) -> typing.List[int]:
-    return ctx.locations.get_checked(ctx.location_checks, team, slot)
+    return ctx.locations.get_checked(None, team, slot)
 
 
 def get_missing_checks(ctx: Context, team: int, slot: int) -> typing.List[int]:
-    return ctx.locations.get_missing(ctx.location_checks, team, slot)
+    return ctx.locations.get_missing(None, team, slot)
 
 
 def get_client_points(ctx: Context, client: Client) -> int:
@@ -1936,23 +2339,13 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            games = frozenset(ctx.gamespackage).intersection(args.get("games", []))
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
-            exclusions = set(exclusions)
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
-
+            games = frozenset(ctx.gamespackage).difference(exclusions)
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            games = frozenset(ctx.gamespackage)
+        await ctx.send_encoded_msgs(client, ctx.get_encoded_data_package(games))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -2181,6 +2574,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
             ctx.stored_data[args["key"]] = args["value"] = value
+            ctx.unsaved_stored_data.add(args["key"])
             targets = set(ctx.stored_data_notification_clients[args["key"]])
             if args.get("want_reply", False):
                 targets.add(client)
@@ -2236,6 +2630,12 @@ class ServerCommandProcessor(CommonCommandProcessor):
             self.output("Saving is disabled.")
             return False
 
+    def _cmd_metrics(self) -> bool:
+        """Show command durations, sent data, broadcast queue, save durations and event loop lag"""
+        for line in self.ctx.metrics.get_summary(len(self.ctx.endpoints)):
+            self.output(line)
+        return True
+
     def _cmd_players(self) -> bool:
         """Get information about connected players"""
         self.output(get_players_string(self.ctx))
@@ -2637,10 +3037,38 @@ def parse_args() -> argparse.Namespace:
     #0 -> recommended for tournaments to force a level playing field, only allow an exact version match
     """)
     parser.add_argument('--log_network', default=defaults["log_network"], action="store_true")
+    parser.add_argument('--metrics_port', default=defaults["metrics_port"], type=int,
+                        help="serve metrics for Prometheus on 127.0.0.1 on this port, 0 to disable")
     args = parser.parse_args()
     return args
 
 
+async def serve_metrics(ctx: Context, port: int) -> asyncio.Server:
+    """Serve ctx.metrics for Prometheus over HTTP on localhost."""
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 10)
+            while (await asyncio.wait_for(reader.readline(), 10)).strip():
+                pass  # headers are not needed
+            if request_line.split(b" ")[:2] in ([b"GET", b"/metrics"], [b"GET", b"/"]):
+                status = "200 OK"
+                body = ctx.metrics.get_prometheus_text(len(ctx.endpoints)).encode()
+            else:
+                status = "404 Not Found"
+                body = b""
+            writer.write(f"HTTP/1.0 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    metrics_server = await asyncio.start_server(handle, "127.0.0.1", port)
+    logging.info(f"Serving metrics at http://127.0.0.1:{port}/metrics")
+    return metrics_server
+
+
 async def auto_shutdown(ctx, to_cancel=None):
     with contextlib.suppress(asyncio.TimeoutError):
         await asyncio.wait_for(ctx.exit_event.wait(), ctx.auto_shutdown)
@@ -2729,11 +3157,16 @@ async def main(args: argparse.Namespace):
                                                  'No password' if not ctx.password else 'Password: %s' % ctx.password))
 
     await ctx.server
+    metrics_server = await serve_metrics(ctx, args.metrics_port) if args.metrics_port else None
+    lag_monitor_task = asyncio.create_task(ctx.metrics.monitor_event_loop_lag())
     console_task = asyncio.create_task(console(ctx))
     if ctx.auto_shutdown:
         ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, [console_task]))
     await ctx.exit_event.wait()
     console_task.cancel()
+    lag_monitor_task.cancel()
+    if metrics_server:
+        metrics_server.close()
     if ctx.shutdown_task:
         await ctx.shutdown_task
 
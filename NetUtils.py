@@ -6,6 +6,8 @@ import enum
 import warnings
 from json import JSONEncoder, JSONDecoder
 
+import orjson
+
 if typing.TYPE_CHECKING:
     from websockets import WebSocketServerProtocol as ServerConnection
 
@@ -135,8 +137,31 @@ _encode = JSONEncoder(
 ).encode
 
 
+def _encode_default(obj: typing.Any) -> typing.Any:
+    """Converts what orjson can't serialize on its own the way _scan_for_TypedTuples does."""
+    if isinstance(obj, tuple) and hasattr(obj, "_fields"):
+        data = obj._asdict()
+        data["class"] = obj.__class__.__name__
+        return data
+    if isinstance(obj, (set, frozenset)):
+        return tuple(obj)
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+_orjson_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
 def encode(obj: typing.Any) -> str:
-    return _encode(_scan_for_TypedTuples(obj))
+    """
+    Encodes obj to JSON, with NamedTuples as objects that name their class. NamedTuples and sets are converted while
+    they get serialized, instead of copying all of obj first. NaN and infinite floats are encoded as null, as they are
+    not valid JSON.
+    """
+    try:
+        return orjson.dumps(obj, default=_encode_default, option=_orjson_options).decode()
+    except orjson.JSONEncodeError:
+        # orjson is stricter than json, for example about integers bigger than 64 bits
+        return _encode(_scan_for_TypedTuples(obj))
 
 
 def get_any_version(data: dict) -> Version:
@@ -427,6 +452,8 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
+        self._checked: typing.Dict[typing.Tuple[int, int], typing.Set[int]] = {}
+
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
         for finding_player, check_data in self.items():
@@ -443,9 +470,22 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
                     all_locations[source_slot].add(location_id)
         return all_locations
 
-    def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
-                    ) -> typing.List[int]:
-        checked = state[team, slot]
+    def mark_checked(self, team: int, slot: int, locations: typing.Iterable[int]) -> None:
+        """Mark locations of slot as checked for team. Locations that don't exist for slot are ignored."""
+        player_locations = self[slot]
+        self._checked.setdefault((team, slot), set()).update(
+            location_id for location_id in locations if location_id in player_locations)
+
+    def _get_state(self, state: typing.Optional[typing.Dict[typing.Tuple[int, int], typing.Set[int]]], team: int,
+                   slot: int) -> typing.Set[int]:
+        if state is None:
+            return self._checked.get((team, slot), set())
+        return state[team, slot]
+
+    def get_checked(self, state: typing.Optional[typing.Dict[typing.Tuple[int, int], typing.Set[int]]], team: int,
+                    slot: int) -> typing.List[int]:
+        """Checked locations of slot, either from state or as marked with mark_checked if state is None."""
+        checked = self._get_state(state, team, slot)
         if not checked:
             # This optimizes the case where everyone connects to a fresh game at the same time.
             if slot not in self:
@@ -455,9 +495,10 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
                 location_id in self[slot] if
                 location_id in checked]
 
-    def get_missing(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
-                    ) -> typing.List[int]:
-        checked = state[team, slot]
+    def get_missing(self, state: typing.Optional[typing.Dict[typing.Tuple[int, int], typing.Set[int]]], team: int,
+                    slot: int) -> typing.List[int]:
+        """Missing locations of slot, either from state or as marked with mark_checked if state is None."""
+        checked = self._get_state(state, team, slot)
         if not checked:
             # This optimizes the case where everyone connects to a fresh game at the same time.
             return list(self[slot])
@@ -465,9 +506,10 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
                 location_id in self[slot] if
                 location_id not in checked]
 
-    def get_remaining(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
-                      ) -> typing.List[typing.Tuple[int, int]]:
-        checked = state[team, slot]
+    def get_remaining(self, state: typing.Optional[typing.Dict[typing.Tuple[int, int], typing.Set[int]]], team: int,
+                      slot: int) -> typing.List[typing.Tuple[int, int]]:
+        """(receiver, item) of missing locations of slot, either from state or as marked if state is None."""
+        checked = self._get_state(state, team, slot)
         player_locations = self[slot]
         return sorted([(player_locations[location_id][1], player_locations[location_id][0]) for
                         location_id in player_locations if
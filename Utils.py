@@ -669,8 +669,91 @@ def format_SI_prefix(value, power=1000, power_labels=("", "k", "M", "G", "T", "P
     return f"{value.quantize(decimal.Decimal('1.00'))} {chaining_prefix(n, power_labels)}"
 
 
+class FuzzyIndex(frozenset):
+    """
+    Frozenset of names, for which get_fuzzy_results only scores the names that can still be among the best results.
+    The edit distance of two names is at least their difference in length and at least the number of distinct
+    characters only in one of them. Names are grouped by length on first use, and groups and names whose best possible
+    ratio can't beat the current results are skipped without computing the expensive distance.
+    """
+    # (length, lowered length) -> iteration indices, names, lowered names and masks of characters in lowered names
+    _buckets: typing.Optional[typing.Dict[typing.Tuple[int, int], typing.Tuple[
+        typing.List[int], typing.List[str], typing.List[str], typing.List[int]]]] = None
+
+    @staticmethod
+    def _get_character_mask(word: str) -> int:
+        mask = 0
+        for character in set(word):
+            mask |= 1 << (ord(character) & 127)  # characters sharing a bit only make the bound lower
+        return mask
+
+    def _get_buckets(self) -> typing.Dict[typing.Tuple[int, int], typing.Tuple[
+            typing.List[int], typing.List[str], typing.List[str], typing.List[int]]]:
+        if self._buckets is None:
+            buckets: typing.Dict[typing.Tuple[int, int], typing.Tuple[
+                typing.List[int], typing.List[str], typing.List[str], typing.List[int]]] = {}
+            for index, word in enumerate(self):
+                lowered = word.lower()
+                indices, words, lowered_words, masks = buckets.setdefault((len(word), len(lowered)), ([], [], [], []))
+                indices.append(index)
+                words.append(word)
+                lowered_words.append(lowered)
+                masks.append(self._get_character_mask(lowered))
+            self._buckets = buckets
+        return self._buckets
+
+    def get_fuzzy_results(self, input_word: str, limit: typing.Optional[int] = None) \
+            -> typing.List[typing.Tuple[str, int]]:
+        """Same results as get_fuzzy_results on the names in iteration order."""
+        import heapq
+        import jellyfish
+
+        lowered_input = input_word.lower()
+        length = len(input_word)
+        lowered_length = len(lowered_input)
+        input_mask = self._get_character_mask(lowered_input)
+        limit = limit if limit else len(self)
+        if not limit:
+            return []
+
+        def get_max_ratio(key: typing.Tuple[int, int]) -> float:
+            if key == (length, lowered_length):
+                return 1.01  # may contain input_word itself
+            return 1 - abs(lowered_length - key[1]) / max(length, key[0])
+
+        buckets = self._get_buckets()
+        # min-heap of the best (ratio, -index, word), so ties are resolved by iteration order as a stable sort would
+        results: typing.List[typing.Tuple[float, int, str]] = []
+        for max_ratio, key in sorted(((get_max_ratio(key), key) for key in buckets), reverse=True):
+            if len(results) >= limit and max_ratio < results[0][0]:
+                break
+            indices, words, lowered_words, masks = buckets[key]
+            length_distance = abs(lowered_length - key[1])
+            denominator = max(length, key[0])
+            character_distances = [max((mask & ~input_mask).bit_count(), (input_mask & ~mask).bit_count())
+                                   for mask in masks]
+            for character_distance, position in sorted(zip(character_distances, range(len(words)))):
+                word = words[position]
+                if word == input_word:
+                    ratio = 1.01
+                else:
+                    if len(results) >= limit and \
+                            1 - max(length_distance, character_distance) / denominator < results[0][0]:
+                        break  # the remaining names of this group have the same or a lower bound
+                    ratio = (1 - jellyfish.damerau_levenshtein_distance(lowered_input, lowered_words[position])
+                             / denominator)
+                if len(results) < limit:
+                    heapq.heappush(results, (ratio, -indices[position], word))
+                elif (ratio, -indices[position]) > results[0][:2]:
+                    heapq.heapreplace(results, (ratio, -indices[position], word))
+        return [(word, int(ratio*100)) for ratio, _, word in sorted(results, reverse=True)]
+
+
 def get_fuzzy_results(input_word: str, word_list: typing.Collection[str], limit: typing.Optional[int] = None) \
         -> typing.List[typing.Tuple[str, int]]:
+    if isinstance(word_list, FuzzyIndex):
+        return word_list.get_fuzzy_results(input_word, limit)
+
     import jellyfish
 
     def get_fuzzy_ratio(word1: str, word2: str) -> float:
@@ -693,6 +776,8 @@ def get_fuzzy_results(input_word: str, word_list: typing.Collection[str], limit:
 
 
 def get_intended_text(input_text: str, possible_answers) -> typing.Tuple[str, bool, str]:
+    if len(possible_answers) > 1 and input_text in possible_answers:
+        return input_text, True, "Perfect Match"  # skip scoring the rest, as no other answer could be picked
     picks = get_fuzzy_results(input_text, possible_answers, limit=2)
     if len(picks) > 1:
         dif = picks[0][1] - picks[1][1]
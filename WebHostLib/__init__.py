@@ -36,6 +36,10 @@ app.config["MAX_FORM_MEMORY_SIZE"] = 2 * 1024 * 1024  # 2 MB, needed for large o
 # custom config
 app.config["SELFHOST"] = True  # application process is in charge of running the websites
 app.config["GENERATORS"] = 8  # maximum concurrent world gens
+# additional concurrent world gens that only run small generations, so they don't have to wait behind big ones
+app.config["FAST_GENERATORS"] = 1
+# highest estimated cost of generations on the fast generators, which is the amount of worlds plus additional games
+app.config["FAST_GENERATION_MAX_COST"] = 4
 app.config["HOSTERS"] = 8  # maximum concurrent room hosters
 app.config["SELFLAUNCH"] = True  # application process is in charge of launching Rooms.
 app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt Room websocket connections
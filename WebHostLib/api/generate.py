@@ -82,4 +82,9 @@ def wait_seed_api(seed: UUID):
         return {"text": "Generation not found"}, 404
     elif generation.state == STATE_ERROR:
         return {"text": "Generation failed"}, 500
+    elif generation.state == STATE_QUEUED:
+        return {"text": "Generation queued"}, 202
+    progress = json.loads(generation.meta).get("progress")
+    if progress:
+        return {"text": "Generation running", "progress": progress}, 202
     return {"text": "Generation running"}, 202
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import concurrent.futures
+import contextlib
 import json
 import logging
 import multiprocessing
+import os
+import time
 import typing
 from datetime import timedelta, datetime
-from threading import Event, Thread
+from threading import Event, Lock, Thread
 from typing import Any
 from uuid import UUID
 
@@ -16,6 +20,9 @@ from .locker import Locker, AlreadyRunningException
 
 _stop_event = Event()
 
+FULL_ROOM_CHECK_INTERVAL = 5
+""" seconds between checks of all recently active rooms, instead of only those with new activity """
+
 
 def stop() -> None:
     """Stops previously launched threads"""
@@ -36,6 +43,39 @@ def handle_generation_failure(result: BaseException):
         logging.exception(e)
 
 
+class GenerationProgressHandler(logging.Handler):
+    """Stores the last step logged by Main in the meta of the Generation, to show it while waiting for the seed."""
+    steps = ("Creating MultiWorld.", "Creating Items.", "Calculating Access Rules.", "Running Item Plando.",
+             "Running Pre Main Fill.", "Filling the multiworld", "Beginning output", "Generating output files",
+             "Calculating playthrough.", "Creating final archive")
+    """ starts of the messages of Main that begin a step, other messages are not shown """
+    interval = 1
+    """ minimum seconds between writes of the progress, steps logged sooner after a write are skipped """
+
+    def __init__(self, sid: UUID):
+        super().__init__(logging.INFO)
+        self.sid = sid
+        self.next_write = 0.0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.module != "Main" or not isinstance(record.msg, str) or not record.msg.startswith(self.steps):
+            return
+        now = time.monotonic()
+        if now < self.next_write:
+            return
+        self.next_write = now + self.interval
+        try:
+            progress = record.getMessage()
+            with db_session:
+                generation = Generation.get(id=self.sid)
+                if generation is not None and generation.state == STATE_STARTED:
+                    meta = json.loads(generation.meta)
+                    meta["progress"] = progress
+                    generation.meta = json.dumps(meta)
+        except Exception:
+            self.handleError(record)
+
+
 def _mp_gen_game(
     gen_options: dict,
     meta: dict[str, Any] | None = None,
@@ -46,29 +86,88 @@ def _mp_gen_game(
     from setproctitle import setproctitle
 
     setproctitle(f"Generator ({sid})")
+    progress_handler = GenerationProgressHandler(sid)
+    logging.getLogger().addHandler(progress_handler)
     try:
         return gen_game(gen_options, meta=meta, owner=owner, sid=sid, timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        # the generation keeps running in its thread, which can't be stopped, so end this process instead.
+        # the pool replaces it and the autogen frees the slot once the time is up.
+        logging.info(f"Ending generator process of {sid} after timeout")
+        os._exit(1)
     finally:
+        logging.getLogger().removeHandler(progress_handler)
         setproctitle(f"Generator (idle)")
 
 
-def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, timeout: int|None) -> None:
-    try:
-        meta = json.loads(generation.meta)
-        options = restricted_loads(generation.options)
-        logging.info(f"Generating {generation.id} for {len(options)} players")
-        pool.apply_async(
+def estimate_generation_cost(options: dict[str, dict[str, Any]]) -> int:
+    """Estimates how long a generation takes, roughly in worlds. Each world adds to it, and so does each other game."""
+    return len(options) + len({player_options.get("game") for player_options in options.values()}) - 1
+
+
+class GenerationLane:
+    """A pool of generator processes and the generations running on it."""
+    pool: multiprocessing.pool.Pool
+    size: int
+    max_cost: int | None
+    """ generations estimated to cost more than this run on other lanes, None to run any generation """
+    running: dict[UUID, float | None]
+    """ time until which each running generation is allowed to run, None if there is no timeout """
+
+    def __init__(self, pool: multiprocessing.pool.Pool, size: int, max_cost: int | None):
+        self.pool = pool
+        self.size = size
+        self.max_cost = max_cost
+        self.running = {}
+        self.lock = Lock()
+
+    def accepts(self, cost: int) -> bool:
+        return self.max_cost is None or cost <= self.max_cost
+
+    def has_capacity(self) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            for sid, deadline in list(self.running.items()):
+                # a generation that timed out ends its process, which does not report back
+                if deadline is not None and deadline < now:
+                    del self.running[sid]
+            return len(self.running) < self.size
+
+    def _finished(self, sid: UUID) -> None:
+        with self.lock:
+            self.running.pop(sid, None)
+
+    def start(self, sid: UUID, options: dict, meta: dict[str, Any], owner: UUID, timeout: int | None) -> None:
+        def on_success(seed_id) -> None:
+            self._finished(sid)
+            handle_generation_success(seed_id)
+
+        def on_failure(result: BaseException) -> None:
+            self._finished(sid)
+            handle_generation_failure(result)
+
+        with self.lock:
+            # a minute of buffer for the process to report the timeout and end
+            self.running[sid] = time.monotonic() + timeout + 60 if timeout else None
+        self.pool.apply_async(
             _mp_gen_game,
             (options,),
             {
                 "meta": meta,
-                "sid": generation.id,
-                "owner": generation.owner,
+                "sid": sid,
+                "owner": owner,
                 "timeout": timeout,
             },
-            handle_generation_success,
-            handle_generation_failure,
+            on_success,
+            on_failure,
         )
+
+
+def launch_generator(lane: GenerationLane, generation: Generation, options: dict, timeout: int|None) -> None:
+    try:
+        meta = json.loads(generation.meta)
+        logging.info(f"Generating {generation.id} for {len(options)} players")
+        lane.start(generation.id, options, meta, generation.owner, timeout)
     except Exception as e:
         generation.state = STATE_ERROR
         commit()
@@ -125,15 +224,23 @@ def autohost(config: dict):
                     hosters.append(hoster)
                     hoster.start()
 
+                # only activity starts rooms, so between full checks only rooms with new activity are selected
+                next_full_check = 0.0
                 while not stop_event.wait(0.1):
+                    now = datetime.utcnow()
+                    if time.monotonic() >= next_full_check:
+                        # restarts rooms that stopped while active, and catches activity committed late
+                        activity_since = now - timedelta(days=3)
+                        next_full_check = time.monotonic() + FULL_ROOM_CHECK_INTERVAL
                     with db_session:
-                        rooms = select(
-                            room for room in Room if
-                            room.last_activity >= datetime.utcnow() - timedelta(days=3))
+                        rooms = select(room for room in Room if room.last_activity >= activity_since)
                         for room in rooms:
                             # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
-                            if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5):
-                                hosters[room.id.int % len(hosters)].start_room(room.id)
+                            if room.last_activity >= now - timedelta(seconds=room.timeout + 5):
+                                start_room(hosters, room.id)
+                        send_commands(hosters)
+                    # overlap the checks, as activity may be committed a bit after its timestamp was taken
+                    activity_since = now - timedelta(seconds=10)
 
         except AlreadyRunningException:
             logging.info("Autohost reports as already running, not starting another.")
@@ -141,14 +248,42 @@ def autohost(config: dict):
     Thread(target=keep_running, name="AP_Autohost").start()
 
 
+def start_room(hosters: list[MultiworldInstance], room_id: UUID) -> None:
+    """Starts the room on the least loaded hoster, unless it is being hosted already."""
+    if not any(hoster.is_hosting(room_id) for hoster in hosters):
+        min(hosters, key=MultiworldInstance.get_load_score).start_room(room_id)
+
+
+def send_commands(hosters: list[MultiworldInstance]) -> None:
+    """
+    Sends commands from room pages to the hosters of their rooms, and deletes the commands the rooms have run.
+    Until then commands stay in the database, so commands for rooms that are not being hosted, fail to load
+    or shut down before running them are sent again once the room is started.
+    """
+    run_command_ids = [command_id for hoster in hosters for command_id in hoster.collect_run_commands()]
+    if run_command_ids:
+        Command.select(lambda command: command.id in run_command_ids).delete(bulk=True)
+    for command in Command.select().order_by(Command.id):
+        for hoster in hosters:
+            if hoster.send_command(command.id, command.room.id, command.commandtext):
+                break
+
+
 def autogen(config: dict):
     def keep_running():
         stop_event = _stop_event
         try:
             with Locker("autogen"):
 
-                with multiprocessing.Pool(config["GENERATORS"], initializer=init_generator,
-                                          initargs=(config,), maxtasksperchild=10) as generator_pool:
+                with contextlib.ExitStack() as stack:
+                    # small generations get their own lane, so they don't wait behind big ones
+                    lanes: list[GenerationLane] = []
+                    for size, max_cost in ((config["FAST_GENERATORS"], config["FAST_GENERATION_MAX_COST"]),
+                                           (config["GENERATORS"], None)):
+                        if size:
+                            pool = stack.enter_context(multiprocessing.Pool(size, initializer=init_generator,
+                                                                            initargs=(config,), maxtasksperchild=10))
+                            lanes.append(GenerationLane(pool, size, max_cost))
                     job_time = config["JOB_TIME"]
                     with db_session:
                         to_start = select(generation for generation in Generation if generation.state == STATE_STARTED)
@@ -160,19 +295,36 @@ def autogen(config: dict):
                                 if sid:
                                     generation.delete()
                                 else:
-                                    launch_generator(generator_pool, generation, timeout=job_time)
+                                    generation.state = STATE_QUEUED
 
                             commit()
                         select(generation for generation in Generation if generation.state == STATE_ERROR).delete()
 
+                    queued_options: dict[UUID, tuple[dict, int]] = {}
+                    """ options and estimated cost of generations that are waiting for a lane """
                     while not stop_event.wait(0.1):
+                        if not any(lane.has_capacity() for lane in lanes):
+                            continue
                         with db_session:
                             # for update locks the database row(s) during transaction, preventing writes from elsewhere
                             to_start = select(
                                 generation for generation in Generation
                                 if generation.state == STATE_QUEUED).for_update()
                             for generation in to_start:
-                                launch_generator(generator_pool, generation, timeout=job_time)
+                                if generation.id not in queued_options:
+                                    try:
+                                        options = restricted_loads(generation.options)
+                                    except Exception as e:
+                                        generation.state = STATE_ERROR
+                                        logging.exception(e)
+                                        continue
+                                    queued_options[generation.id] = options, estimate_generation_cost(options)
+                                options, cost = queued_options[generation.id]
+                                lane = next((lane for lane in lanes if lane.accepts(cost) and lane.has_capacity()),
+                                            None)
+                                if lane:
+                                    del queued_options[generation.id]
+                                    launch_generator(lane, generation, options, timeout=job_time)
         except AlreadyRunningException:
             logging.info("Autogen reports as already running, not starting another.")
 
@@ -189,6 +341,13 @@ class MultiworldInstance():
         self.host = config["HOST_ADDRESS"]
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
+        self.room_commands = multiprocessing.Queue()
+        self.run_commands = multiprocessing.Queue()
+        self.sent_commands: dict[int, UUID] = {}
+        """ room of each command that was sent to this hoster and not reported as run yet """
+        self.run_command_ids: list[int] = []
+        self.load_reports = multiprocessing.Queue()
+        self.load = HosterLoad(0, 0, 0, 0.0)
         self.name = f"MultiHoster{id}"
 
     def start(self):
@@ -198,20 +357,66 @@ class MultiworldInstance():
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down,
+                                                self.room_commands, self.run_commands, self.load_reports),
                                           name=self.name)
         process.start()
         self.process = process
 
-    def start_room(self, room_id):
+    def _remove_shut_down_rooms(self) -> None:
         while not self.rooms_shutting_down.empty():
-            self.room_ids.remove(self.rooms_shutting_down.get(block=True, timeout=None))
+            room_id = self.rooms_shutting_down.get(block=True, timeout=None)
+            self.room_ids.remove(room_id)
+            # commands the room did not run are sent again when it is started again
+            self._receive_run_commands()
+            for command_id, command_room_id in list(self.sent_commands.items()):
+                if command_room_id == room_id:
+                    del self.sent_commands[command_id]
+
+    def start_room(self, room_id):
+        self._remove_shut_down_rooms()
         if room_id in self.room_ids:
             pass  # should already be hosted currently.
         else:
             self.room_ids.add(room_id)
             self.rooms_to_start.put(room_id)
 
+    def is_hosting(self, room_id: UUID) -> bool:
+        self._remove_shut_down_rooms()
+        return room_id in self.room_ids
+
+    def get_load_score(self) -> tuple[bool, int, int]:
+        """Returns a score of the load of this hoster, the least loaded hoster has the lowest score."""
+        while not self.load_reports.empty():
+            self.load = self.load_reports.get(block=True, timeout=None)
+        self._remove_shut_down_rooms()
+        # rooms count themselves, as rooms that were started since the last report are not in it yet
+        return self.load.event_loop_lag >= 1, self.load.clients + len(self.room_ids), self.load.rss
+
+    def send_command(self, command_id: int, room_id: UUID, commandtext: str) -> bool:
+        """
+        Sends a command to a room of this hoster, unless it was sent already.
+        Returns False if the room is not being hosted.
+        """
+        if not self.is_hosting(room_id):
+            return False
+        if command_id not in self.sent_commands:
+            self.sent_commands[command_id] = room_id
+            self.room_commands.put((room_id, command_id, commandtext))
+        return True
+
+    def _receive_run_commands(self) -> None:
+        while not self.run_commands.empty():
+            command_id = self.run_commands.get(block=True, timeout=None)
+            self.sent_commands.pop(command_id, None)
+            self.run_command_ids.append(command_id)
+
+    def collect_run_commands(self) -> list[int]:
+        """Returns the ids of the commands the rooms of this hoster have run since the last call."""
+        self._receive_run_commands()
+        command_ids, self.run_command_ids = self.run_command_ids, []
+        return command_ids
+
     def stop(self):
         if self.process:
             self.process.terminate()
@@ -225,6 +430,6 @@ class MultiworldInstance():
         self.process = None
 
 
-from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
-from .customserver import run_server_process, get_static_server_data
+from .models import Command, Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
+from .customserver import HosterLoad, run_server_process, get_static_server_data
 from .generate import gen_game
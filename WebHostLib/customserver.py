@@ -10,12 +10,12 @@ import pickle
 import random
 import socket
 import threading
-import time
 import typing
 import sys
+from uuid import UUID
 
 import websockets
-from pony.orm import commit, db_session, select
+from pony.orm import db_session
 
 import Utils
 
@@ -24,8 +24,9 @@ from MultiServer import (
     server_per_message_deflate_factory,
 )
 from Utils import restricted_loads, cache_argsless
+from .datapackage import get_data_package
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Room, db
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -74,6 +75,7 @@ class WebHostContext(Context):
         self.main_loop = asyncio.get_running_loop()
         self.video = {}
         self.tags = ["AP", "WebHost"]
+        self.db_command_processor = DBCommandProcessor(self)
 
     def __del__(self):
         try:
@@ -89,19 +91,9 @@ class WebHostContext(Context):
             setattr(self, key, value)
         self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
 
-    def listen_to_db_commands(self):
-        cmdprocessor = DBCommandProcessor(self)
-
-        while not self.exit_event.is_set():
-            with db_session:
-                commands = select(command for command in Command if command.room.id == self.room_id)
-                if commands:
-                    for command in commands:
-                        self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                        command.delete()
-                    commit()
-            del commands
-            time.sleep(5)
+    def run_db_command(self, commandtext: str) -> None:
+        """Runs a command that was sent from the room page, which the autohost delivers to the hosting process."""
+        self.db_command_processor(commandtext)
 
     @db_session
     def load(self, room_id: int):
@@ -131,9 +123,11 @@ class WebHostContext(Context):
                     # games package could be dropped from static data once all rooms embed data package
                     del multidata["datapackage"][game]
                 else:
-                    row = GameDataPackage.get(checksum=game_data["checksum"])
-                    if row:  # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
-                        game_data_packages[game] = restricted_loads(row.data)
+                    data_package = get_data_package(game_data["checksum"])
+                    # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
+                    if data_package:
+                        # shared by rooms of this process, and _load removes the groups from the room's copy
+                        game_data_packages[game] = dict(data_package)
                         continue
                     else:
                         self.logger.warning(f"Did not find game_data_package for {game}: {game_data['checksum']}")
@@ -158,7 +152,6 @@ class WebHostContext(Context):
                 if savegame_data:
                     self.set_save(restricted_loads(Room.get(id=self.room_id).multisave))
             self._start_async_saving(atexit_save=False)
-        threading.Thread(target=self.listen_to_db_commands, daemon=True).start()
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
@@ -176,6 +169,19 @@ class WebHostContext(Context):
         return d
 
 
+class HosterLoad(typing.NamedTuple):
+    """Load of a hosting process, reported to the autohost to start new rooms on the least loaded process."""
+    rooms: int
+    clients: int
+    rss: int
+    """ resident memory in bytes, 0 if psutil is not installed """
+    event_loop_lag: float
+    """ seconds the event loop woke up late when measuring """
+
+
+HOSTER_LOAD_REPORT_INTERVAL = 5  # in seconds
+
+
 def get_random_port():
     return random.randint(49152, 65535)
 
@@ -231,7 +237,9 @@ def set_up_logging(room_id) -> logging.Logger:
 
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       room_commands: multiprocessing.Queue, run_commands: multiprocessing.Queue,
+                       load_reports: multiprocessing.Queue):
     from setproctitle import setproctitle
 
     setproctitle(name)
@@ -275,6 +283,41 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    room_contexts: typing.Dict[UUID, WebHostContext] = {}
+    pending_commands: typing.Dict[UUID, typing.List[typing.Tuple[int, str]]] = collections.defaultdict(list)
+    """ commands for rooms that are still loading """
+
+    def run_command(ctx: WebHostContext, command_id: int, commandtext: str) -> None:
+        ctx.run_db_command(commandtext)
+        run_commands.put(command_id)  # the autohost deletes the command once it ran
+
+    def receive_command(room_id: UUID, command_id: int, commandtext: str) -> None:
+        ctx = room_contexts.get(room_id)
+        if ctx:
+            run_command(ctx, command_id, commandtext)
+        else:
+            pending_commands[room_id].append((command_id, commandtext))
+
+    def receive_commands() -> None:
+        while 1:
+            room_id, command_id, commandtext = room_commands.get(block=True, timeout=None)
+            loop.call_soon_threadsafe(receive_command, room_id, command_id, commandtext)
+
+    async def report_load() -> None:
+        try:
+            import psutil
+            process = psutil.Process()
+        except ImportError:
+            process = None
+        while 1:
+            start = loop.time()
+            await asyncio.sleep(HOSTER_LOAD_REPORT_INTERVAL)
+            load_reports.put(HosterLoad(
+                len(room_contexts),
+                sum(len(ctx.endpoints) for ctx in room_contexts.values()),
+                process.memory_info().rss if process else 0,
+                max(0.0, loop.time() - start - HOSTER_LOAD_REPORT_INTERVAL),
+            ))
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
@@ -283,6 +326,9 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 ctx = WebHostContext(static_server_data, logger)
                 ctx.load(room_id)
                 ctx.init_save()
+                room_contexts[room_id] = ctx
+                for command_id, commandtext in pending_commands.pop(room_id, ()):
+                    run_command(ctx, command_id, commandtext)
                 assert ctx.server is None
                 try:
                     ctx.server = websockets.serve(
@@ -339,6 +385,8 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     ctx._save()
                     setattr(asyncio.current_task(), "save", None)
             finally:
+                room_contexts.pop(room_id, None)
+                pending_commands.pop(room_id, None)
                 try:
                     ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
                     ctx.exit_event.set()  # make sure the saving thread stops at some point
@@ -378,6 +426,8 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     starter = Starter()
     starter.daemon = True
     starter.start()
+    threading.Thread(target=receive_commands, name="CommandReceiver", daemon=True).start()
+    loop.create_task(report_load())
     try:
         loop.run_forever()
     finally:
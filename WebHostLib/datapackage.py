@@ -0,0 +1,58 @@
+import functools
+import typing
+
+from NetUtils import GamesPackage
+from Utils import restricted_loads
+from .models import GameDataPackage
+
+# Data packages are stored once per checksum and never change, so each process keeps the recently used ones decoded,
+# sharing them between all rooms and requests. They must not be modified.
+DATA_PACKAGE_CACHE_SIZE = 64
+
+
+class NameTable(dict):
+    """Maps ids to names. Unknown ids get a placeholder name, which is not stored, as tables are shared."""
+    __slots__ = ("unknown_name",)
+
+    def __init__(self, unknown_name: str, names: typing.Dict[int, str]):
+        super().__init__(names)
+        self.unknown_name = unknown_name
+
+    def __missing__(self, key: int) -> str:
+        return self.unknown_name.format(key)
+
+
+class GameNames(typing.NamedTuple):
+    item_name_to_id: typing.Dict[str, int]
+    location_name_to_id: typing.Dict[str, int]
+    item_id_to_name: NameTable
+    location_id_to_name: NameTable
+
+
+@functools.lru_cache(maxsize=DATA_PACKAGE_CACHE_SIZE)
+def _load_data_package(checksum: str) -> GamesPackage:
+    row = GameDataPackage.get(checksum=checksum)
+    if not row:
+        raise KeyError(checksum)  # not cached, as the data package may get uploaded later
+    return restricted_loads(row.data)
+
+
+def get_data_package(checksum: str) -> typing.Optional[GamesPackage]:
+    """Returns the decoded data package with checksum, or None if it is not stored."""
+    try:
+        return _load_data_package(checksum)
+    except KeyError:
+        return None
+
+
+@functools.lru_cache(maxsize=DATA_PACKAGE_CACHE_SIZE)
+def get_game_names(checksum: str) -> GameNames:
+    """Returns the name lookup tables of the data package with checksum, raises KeyError if it is not stored."""
+    game_package = _load_data_package(checksum)
+    return GameNames(
+        game_package["item_name_to_id"],
+        game_package["location_name_to_id"],
+        NameTable("Unknown Item (ID: {})", {id: name for name, id in game_package["item_name_to_id"].items()}),
+        NameTable("Unknown Location (ID: {})",
+                  {id: name for name, id in game_package["location_name_to_id"].items()}),
+    )
@@ -1,5 +1,7 @@
 import datetime
 import collections
+import functools
+import threading
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
@@ -12,10 +14,13 @@ from MultiServer import Context, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
 from Utils import restricted_loads, KeyedDefaultDict
 from . import app, cache
-from .models import GameDataPackage, Room
+from .datapackage import get_game_names
+from .models import Room, Seed
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
+# Rooms whose decoded multisave is kept, to not unpickle it again while it did not change.
+TRACKER_MULTISAVE_CACHE_SIZE = 64
 
 _multiworld_trackers: Dict[str, Callable] = {}
 _player_trackers: Dict[str, Callable] = {}
@@ -24,6 +29,35 @@ TeamPlayer = Tuple[int, int]
 ItemMetadata = Tuple[int, int, int]
 
 
+@functools.lru_cache(maxsize=16)
+def _get_multidata(seed_id: UUID) -> Dict[str, Any]:
+    """Decompresses the multidata of a seed, which never changes, so it is kept for the most recently tracked seeds."""
+    return Context.decompress(Seed[seed_id].multidata)
+
+
+_multisaves: "collections.OrderedDict[UUID, Tuple[bytes, Dict[str, Any]]]" = collections.OrderedDict()
+_multisaves_lock = threading.Lock()
+
+
+def _get_multisave(room: Room) -> Dict[str, Any]:
+    """Loads the multisave of a room, reusing the one loaded for an earlier request if the room did not save since."""
+    data = room.multisave
+    if not data:
+        return {}
+    with _multisaves_lock:
+        cached = _multisaves.get(room.id)
+        if cached and cached[0] == data:
+            _multisaves.move_to_end(room.id)
+            return cached[1]
+    multisave = restricted_loads(data)
+    with _multisaves_lock:
+        _multisaves[room.id] = data, multisave
+        _multisaves.move_to_end(room.id)
+        while len(_multisaves) > TRACKER_MULTISAVE_CACHE_SIZE:
+            _multisaves.popitem(last=False)
+    return multisave
+
+
 def _cache_results(func: Callable) -> Callable:
     """Stores the results of any computationally expensive methods after the initial call in TrackerData.
     If called again, returns the cached result instead, as results will not change for the lifetime of TrackerData.
@@ -46,6 +80,8 @@ class TrackerData:
 
     Provides helper methods to lazily load necessary data that each tracker require and caches any results so any
     subsequent helper method calls do not need to recompute results during the lifetime of this instance.
+    The decoded multidata, multisave and name lookup tables are shared with other requests, so they must not be
+    modified.
     """
     room: Room
     _multidata: Dict[str, Any]
@@ -55,8 +91,8 @@ class TrackerData:
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        self._multidata = _get_multidata(room.seed.id)
+        self._multisave = _get_multisave(room)
         self._tracker_cache = {}
 
         self.item_name_to_id: Dict[str, Dict[str, int]] = {}
@@ -70,15 +106,13 @@ class TrackerData:
             game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
         })
         for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
+            game_names = get_game_names(game_package["checksum"])
+            self.item_id_to_name[game] = game_names.item_id_to_name
+            self.location_id_to_name[game] = game_names.location_id_to_name
 
             # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+            self.item_name_to_id[game] = game_names.item_name_to_id
+            self.location_name_to_id[game] = game_names.location_name_to_id
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
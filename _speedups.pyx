@@ -11,9 +11,10 @@ This is deliberately .pyx because using a non-compiled "pure python" may be slow
 import cython
 import warnings
 from cpython cimport PyObject
-from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
+from typing import (Any, Dict, Iterable, Iterator, Generator, Optional, Sequence, Tuple, TypeVar, Union, Set, List,
+                    TYPE_CHECKING)
 from cymem.cymem cimport Pool
-from libc.stdint cimport int64_t, uint32_t
+from libc.stdint cimport int64_t, uint32_t, uint64_t
 from collections import defaultdict
 
 cdef extern from *:
@@ -96,6 +97,7 @@ cdef class LocationStore:
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
     cdef PyObject** _raw_proxies  # 8K/1000 players, faster access to _proxies, but does not keep a ref
+    cdef dict _checked  # team -> bytearray with one bit per entry, 12.5KB/100k locations per team
 
     def get_size(self):
         from sys import getsizeof
@@ -106,6 +108,7 @@ cdef class LocationStore:
         size += sum(sizeof(item) for item in self._items)
         size += sum(sizeof(proxy) for proxy in self._proxies)
         size += sizeof(self._raw_proxies[0]) * self.sender_index_size
+        size += getsizeof(self._checked) + sum(getsizeof(bits) for bits in self._checked.values())
         return size
 
     def __init__(self, locations_dict: Dict[int, Dict[int, Sequence[int]]]) -> None:
@@ -114,6 +117,7 @@ cdef class LocationStore:
         self._keys = []
         self._items = []
         self._proxies = []
+        self._checked = {}
 
         # iterate over everything to get all maxima and validate everything
         cdef size_t max_sender = INVALID_SIZE  # keep track of highest used player id for indexing
@@ -258,7 +262,51 @@ cdef class LocationStore:
                         all_locations[sender].add(entry.location)
         return all_locations
 
-    def get_checked(self, state: State, team: int, slot: int) -> List[int]:
+    # checked locations, stored as bitmap aligned with entries
+    cdef uint64_t* _get_checked_bits(self, team: int, bint create):
+        cdef bytearray bits = self._checked.get(team, None)
+        if bits is None:
+            if not create:
+                return NULL
+            bits = self._checked[team] = bytearray(((self.entry_count + 63) // 64 or 1) * sizeof(uint64_t))
+        return <uint64_t*><char*>bits
+
+    cdef void _get_range(self, slot: int, size_t* start, size_t* count) except *:
+        cdef ap_player_t sender = slot  # NOTE: this may raise OverflowError
+        if sender < 1 or sender >= self.sender_index_size:
+            raise KeyError(slot)
+        start[0] = self.sender_index[sender].start
+        count[0] = self.sender_index[sender].count
+
+    def mark_checked(self, team: int, slot: int, locations: Iterable[int]) -> None:
+        """Mark locations of slot as checked for team. Locations that don't exist for slot are ignored."""
+        cdef size_t start, count, i
+        self._get_range(slot, &start, &count)
+        if not count:
+            return
+        cdef PlayerLocationProxy proxy = <PlayerLocationProxy><object>self._raw_proxies[slot]
+        cdef uint64_t* bits = self._get_checked_bits(team, True)
+        cdef LocationEntry* entry
+        for location in locations:
+            entry = proxy._get(location)
+            if entry:
+                i = entry - self.entries
+                bits[i >> 6] |= (<uint64_t>1) << (i & 63)
+
+    cdef inline bint _is_checked(self, uint64_t* bits, size_t i) nogil:
+        return bits != NULL and (bits[i >> 6] >> (i & 63)) & 1
+
+    def get_checked(self, state: Optional[State], team: int, slot: int) -> List[int]:
+        """Checked locations of slot, either from state or as marked with mark_checked if state is None."""
+        cdef size_t start, count, i
+        cdef uint64_t* bits
+        if state is None:
+            self._get_range(slot, &start, &count)
+            bits = self._get_checked_bits(team, False)
+            if not bits:
+                return []
+            return [self.entries[i].location for i in range(start, start + count) if self._is_checked(bits, i)]
+
         cdef ap_player_t sender = slot
         if sender < 0 or sender >= self.sender_index_size:
             raise KeyError(slot)
@@ -274,20 +322,28 @@ cdef class LocationStore:
 
         # Unless the set is close to empty, it's cheaper to use the python set directly, so we do that.
         cdef LocationEntry* entry
-        cdef size_t start = self.sender_index[sender].start
-        cdef size_t count = self.sender_index[sender].count
+        start = self.sender_index[sender].start
+        count = self.sender_index[sender].count
         return [entry.location for
                 entry in self.entries[start:start+count] if
                 entry.location in checked]
 
-    def get_missing(self, state: State, team: int, slot: int) -> List[int]:
+    def get_missing(self, state: Optional[State], team: int, slot: int) -> List[int]:
+        """Missing locations of slot, either from state or as marked with mark_checked if state is None."""
         cdef LocationEntry* entry
+        cdef size_t start, count, i
+        cdef uint64_t* bits
+        if state is None:
+            self._get_range(slot, &start, &count)
+            bits = self._get_checked_bits(team, False)
+            return [self.entries[i].location for i in range(start, start + count) if not self._is_checked(bits, i)]
+
         cdef ap_player_t sender = slot
         if sender < 0 or sender >= self.sender_index_size:
             raise KeyError(slot)
         cdef set checked = state[team, slot]
-        cdef size_t start = self.sender_index[sender].start
-        cdef size_t count = self.sender_index[sender].count
+        start = self.sender_index[sender].start
+        count = self.sender_index[sender].count
         if not len(checked):
             # Skip `in` if none have been checked.
             # This optimizes the case where everyone connects to a fresh game at the same time.
@@ -299,14 +355,24 @@ cdef class LocationStore:
                     entry in self.entries[start:start + count] if
                     entry.location not in checked]
 
-    def get_remaining(self, state: State, team: int, slot: int) -> List[Tuple[int, int]]:
+    def get_remaining(self, state: Optional[State], team: int, slot: int) -> List[Tuple[int, int]]:
+        """(receiver, item) of missing locations of slot, either from state or as marked if state is None."""
         cdef LocationEntry* entry
+        cdef size_t start, count, i
+        cdef uint64_t* bits
+        if state is None:
+            self._get_range(slot, &start, &count)
+            bits = self._get_checked_bits(team, False)
+            return sorted([(self.entries[i].receiver, self.entries[i].item) for
+                           i in range(start, start + count) if
+                           not self._is_checked(bits, i)])
+
         cdef ap_player_t sender = slot
         if sender < 0 or sender >= self.sender_index_size:
             raise KeyError(slot)
         cdef set checked = state[team, slot]
-        cdef size_t start = self.sender_index[sender].start
-        cdef size_t count = self.sender_index[sender].count
+        start = self.sender_index[sender].start
+        count = self.sender_index[sender].count
         return sorted([(entry.receiver, entry.item) for
                         entry in self.entries[start:start+count] if
                         entry.location not in checked])
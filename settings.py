@@ -609,6 +609,12 @@ class ServerOptions(Group):
         OFF = 0
         ON = 1
 
+    class MetricsPort(int):
+        """
+        Serve server metrics for Prometheus on http://127.0.0.1:<metrics_port>/metrics, 0 to disable
+        The same metrics can be viewed with /metrics in the server console
+        """
+
     host: str | None = None
     port: int = 38281
     password: str | None = None
@@ -628,6 +634,7 @@ class ServerOptions(Group):
     auto_shutdown: AutoShutdown = AutoShutdown(0)
     compatibility: Compatibility = Compatibility(2)
     log_network: LogNetwork = LogNetwork(0)
+    metrics_port: MetricsPort = MetricsPort(0)
 
 
 class GeneratorOptions(Group):
@@ -687,6 +694,18 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class ParallelWorkers(int):
+        """
+        Amount of worker processes to run generate_early, create_regions, create_items and set_rules of worlds
+        supporting it in, 0 to run everything in the generator process. Only used on platforms that can fork.
+        """
+
+    class PlaythroughTimeLimit(int):
+        """
+        Seconds to spend on culling items that are not required to beat the game from the spoiler playthrough,
+        0 for no limit. Items that could not be checked in time are kept in the playthrough.
+        """
+
     enemizer_path: EnemizerPath = EnemizerPath("EnemizerCLI/EnemizerCLI.Core")  # + ".exe" is implied on Windows
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
@@ -696,6 +715,8 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    parallel_workers: ParallelWorkers = ParallelWorkers(0)
+    playthrough_time_limit: PlaythroughTimeLimit = PlaythroughTimeLimit(0)
     loglevel: str = "info"
     logtime: bool = False
 
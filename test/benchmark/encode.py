@@ -0,0 +1,61 @@
+def run_encode_benchmark(iterations: int = 20) -> None:
+    """
+    Compare NetUtils.encode against converting the message to base types with _scan_for_TypedTuples first, for the
+    messages the server sends the most data with.
+
+    :param iterations: How often each message gets encoded per encoder.
+    """
+    import logging
+    from random import Random
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from NetUtils import (encode, _encode, _scan_for_TypedTuples, Hint, HintStatus, NetworkItem, NetworkPlayer,
+                          NetworkSlot, SlotType)
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    r = Random()
+    r.seed(0)
+    players = range(1, 301)
+    messages = {
+        "ReceivedItems with 20000 items": [{
+            "cmd": "ReceivedItems",
+            "index": 0,
+            "items": [NetworkItem(r.randint(1000, 1999), r.randint(1000, 1999), r.choice(players),
+                                  r.choice((0, 0, 0, 1, 2))) for _ in range(20000)],
+        }],
+        "Connected for 300 players": [{
+            "cmd": "Connected",
+            "team": 0,
+            "slot": 1,
+            "players": [NetworkPlayer(0, player, f"Player{player}", f"Player{player}") for player in players],
+            "missing_locations": list(range(1000, 1500)),
+            "checked_locations": set(range(1500, 2000)),
+            "slot_info": {player: NetworkSlot(f"Player{player}", "Game", SlotType.player) for player in players},
+            "hint_points": 0,
+        }],
+        "hints for 2000 hints": [{
+            "cmd": "SetReply",
+            "key": "_read_hints_0_1",
+            "value": [Hint(r.choice(players), r.choice(players), r.randint(1000, 1999), r.randint(1000, 1999),
+                           r.random() < 0.5, "", 0, HintStatus.HINT_UNSPECIFIED) for _ in range(2000)],
+        }],
+    }
+
+    for name, message in messages.items():
+        with TimeIt(f"{iterations} times scanning and encoding {name}", logger) as scanning:
+            for _ in range(iterations):
+                _encode(_scan_for_TypedTuples(message))
+        with TimeIt(f"{iterations} times encoding {name}", logger) as encoding:
+            for _ in range(iterations):
+                encode(message)
+        logger.info(f"encode took {encoding.dif / scanning.dif:.1%} of the time for {name}.")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_encode_benchmark()
@@ -0,0 +1,313 @@
+"""
+Load test for MultiServer: generates a multidata for a synthetic game, hosts it in a MultiServer process and lets
+simulated clients connect, check and scout locations, use the data storage and reconnect.
+"""
+
+import asyncio
+import typing
+from random import Random
+
+if typing.TYPE_CHECKING:
+    import websockets
+
+default_rates: typing.Dict[str, float] = {"LocationChecks": 0.5, "LocationScouts": 0.2, "Set": 0.5, "Reconnect": 1 / 60}
+""" operations per second each simulated client starts, by operation """
+
+
+def write_multidata(path: str, slots: int, locations_per_slot: int, seed: int = 0) -> None:
+    """
+    Writes a multidata for slots players of the game "Load Test", with items for random players at all locations.
+
+    :param path: Where to write the .archipelago file.
+    :param slots: How many players the multiworld has.
+    :param locations_per_slot: How many locations each player has, with ids starting at 1.
+    :param seed: Seed for placing the items.
+    """
+    import zlib
+
+    from NetUtils import NetworkSlot, SlotType
+    from Utils import restricted_dumps, version_tuple
+
+    r = Random(seed)
+    players = range(1, slots + 1)
+    game_version = (version_tuple.major, version_tuple.minor, version_tuple.build)
+    game_data = {
+        "item_name_to_id": {f"Item {item}": item for item in range(1, 101)},
+        "location_name_to_id": {f"Location {location}": location for location in range(1, locations_per_slot + 1)},
+        "item_name_groups": {},
+        "location_name_groups": {},
+        "checksum": f"load-test-{locations_per_slot}",
+    }
+    multidata = {
+        "slot_data": {player: {} for player in players},
+        "slot_info": {player: NetworkSlot(f"Player{player}", "Load Test", SlotType.player) for player in players},
+        "connect_names": {f"Player{player}": (0, player) for player in players},
+        "locations": {player: {location: (r.randint(1, 100), r.choice(players), r.choice((0, 0, 0, 1, 2)))
+                               for location in range(1, locations_per_slot + 1)}
+                      for player in players},
+        "checks_in_area": {},
+        "server_options": {},
+        "er_hint_data": {},
+        "precollected_items": {player: [] for player in players},
+        "precollected_hints": {player: set() for player in players},
+        "version": game_version,
+        "tags": ["AP"],
+        "minimum_versions": {"server": game_version, "clients": {player: game_version for player in players}},
+        "seed_name": f"LoadTest{seed}",
+        "spheres": [],
+        "datapackage": {"Load Test": game_data},
+        "race_mode": 0,
+    }
+    with open(path, "wb") as f:
+        f.write(bytes([3]))  # version of format
+        f.write(zlib.compress(restricted_dumps(multidata), 1))
+
+
+class SimulatedClient:
+    """A client for one slot that does one operation at a time and measures how long until the server answers it."""
+    url: str
+    slot: int
+    index: int
+    """ index of this client among the clients of its slot, to not check the same locations as the others """
+    clients_per_slot: int
+    locations_per_slot: int
+    socket: typing.Optional["websockets.ClientConnection"]
+    missing_locations: typing.List[int]
+    expected: typing.Optional[typing.Callable[[dict], bool]]
+    """ returns whether a message received from the server answers the current operation """
+    answered: asyncio.Event
+    request_id: int
+
+    def __init__(self, url: str, slot: int, index: int, clients_per_slot: int, locations_per_slot: int) -> None:
+        self.url = url
+        self.slot = slot
+        self.index = index
+        self.clients_per_slot = clients_per_slot
+        self.locations_per_slot = locations_per_slot
+        self.socket = None
+        self.missing_locations = []
+        self.expected = None
+        self.answered = asyncio.Event()
+        self.request_id = 0
+        self.reader_task: typing.Optional[asyncio.Task] = None
+
+    async def read(self, socket: "websockets.ClientConnection") -> None:
+        from NetUtils import decode
+        import websockets
+
+        try:
+            async for data in socket:
+                for msg in decode(data):
+                    if self.expected and self.expected(msg):
+                        self.expected = None
+                        self.answered.set()
+        except websockets.ConnectionClosed:
+            pass
+
+    async def request(self, msgs: typing.List[dict], expected: typing.Callable[[dict], bool], timeout: float) -> bool:
+        """Sends msgs and waits until a message matching expected arrives, returns False on timeout."""
+        from NetUtils import encode
+
+        self.answered.clear()
+        self.expected = expected
+        await self.socket.send(encode(msgs))
+        try:
+            await asyncio.wait_for(self.answered.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.expected = None
+            return False
+        return True
+
+    async def connect(self, timeout: float) -> bool:
+        import websockets
+        from Utils import version_tuple
+
+        self.socket = await websockets.connect(self.url, max_size=None, ping_interval=None)
+        self.reader_task = asyncio.create_task(self.read(self.socket))
+        connected: typing.Dict[str, typing.Any] = {}
+
+        def is_connected(msg: dict) -> bool:
+            if msg["cmd"] in ("Connected", "ConnectionRefused"):
+                connected.update(msg)
+                return True
+            return False
+
+        if not await self.request([{"cmd": "Connect", "password": None, "game": "Load Test",
+                                    "name": f"Player{self.slot}", "uuid": f"load-test-{self.slot}-{self.index}",
+                                    "version": version_tuple, "items_handling": 0b111, "tags": [],
+                                    "slot_data": False},
+                                   {"cmd": "SetNotify", "keys": [f"load_test_{self.slot % 8}"]}],
+                                  is_connected, timeout):
+            return False
+        if connected["cmd"] == "ConnectionRefused":
+            raise ConnectionError(f"Player{self.slot} was refused: {connected['errors']}")
+        self.missing_locations = [location for location in connected["missing_locations"]
+                                  if location % self.clients_per_slot == self.index]
+        return True
+
+    async def disconnect(self) -> None:
+        if self.socket:
+            await self.socket.close()
+            await self.reader_task
+            self.socket = None
+
+    async def run_operation(self, operation: str, timeout: float, r: Random) -> typing.Optional[bool]:
+        """Runs the operation, returns whether it was answered in time, or None if it can't be done right now."""
+        if operation == "LocationChecks":
+            if not self.missing_locations:
+                return None
+            location = self.missing_locations.pop(r.randrange(len(self.missing_locations)))
+            return await self.request([{"cmd": "LocationChecks", "locations": [location]}],
+                                      lambda msg: msg["cmd"] == "RoomUpdate" and
+                                      location in msg.get("checked_locations", ()), timeout)
+        if operation == "LocationScouts":
+            locations = r.sample(range(1, self.locations_per_slot + 1), 5)
+            return await self.request([{"cmd": "LocationScouts", "locations": locations, "create_as_hint": 0}],
+                                      lambda msg: msg["cmd"] == "LocationInfo" and
+                                      msg["locations"][0].location == locations[0], timeout)
+        if operation == "Set":
+            self.request_id += 1
+            request_id = f"{self.slot}-{self.index}-{self.request_id}"
+            return await self.request([{"cmd": "Set", "key": f"load_test_{r.randrange(8)}", "default": 0,
+                                        "want_reply": True, "operations": [{"operation": "add", "value": 1}],
+                                        "load_test_id": request_id}],
+                                      lambda msg: msg["cmd"] == "SetReply" and msg.get("load_test_id") == request_id,
+                                      timeout)
+        if operation == "Reconnect":
+            await self.disconnect()
+            return await self.connect(timeout)
+        raise ValueError(f"Unknown operation {operation}")
+
+
+def run_server_load_benchmark(slots: int = 100, clients: int = 100, locations_per_slot: int = 500,
+                              duration: float = 30, rates: typing.Optional[typing.Dict[str, float]] = None,
+                              timeout: float = 10) -> None:
+    """
+    Hosts a generated multiworld in a MultiServer process and runs simulated clients against it,
+    then logs throughput and latency of each operation.
+
+    :param slots: How many players the multiworld has.
+    :param clients: How many clients connect, spread evenly over the slots.
+    :param locations_per_slot: How many locations each player has.
+    :param duration: How many seconds the clients run operations for, after all of them connected.
+    :param rates: Operations per second each client starts, by operation. Defaults to default_rates.
+    :param timeout: Seconds to wait for the answer to an operation before counting it as timed out.
+    """
+    import logging
+    import os
+    import socket
+    import subprocess
+    import sys
+    import tempfile
+    import time
+
+    import websockets
+
+    from Utils import init_logging, local_path
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    if rates is None:
+        rates = default_rates
+    latencies: typing.Dict[str, typing.List[float]] = {operation: [] for operation in rates}
+    timeouts: typing.Dict[str, int] = {operation: 0 for operation in rates}
+
+    with socket.socket() as s:  # find a free port
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    url = f"ws://127.0.0.1:{port}"
+
+    async def run_client(client: SimulatedClient, start: asyncio.Event, end_time: float, r: Random) -> None:
+        # start at a random point in the cycle, so clients don't run their operations all at the same time
+        total_rate = sum(rates.values())
+        await asyncio.sleep(r.expovariate(total_rate))
+        while time.perf_counter() < end_time:
+            operation = r.choices(list(rates), weights=list(rates.values()))[0]
+            operation_start = time.perf_counter()
+            answered = await client.run_operation(operation, timeout, r)
+            if answered is not None and start.is_set():
+                if answered:
+                    latencies[operation].append(time.perf_counter() - operation_start)
+                else:
+                    timeouts[operation] += 1
+            await asyncio.sleep(r.expovariate(total_rate))
+
+    async def run_clients() -> float:
+        r = Random(0)
+        clients_per_slot = -(-clients // slots)
+        simulated_clients = [SimulatedClient(url, client % slots + 1, client // slots, clients_per_slot,
+                                             locations_per_slot) for client in range(clients)]
+        deadline = time.perf_counter() + 300  # the server has to load all worlds first
+        while True:
+            try:
+                await (await websockets.connect(url)).close()
+                break
+            except OSError:
+                if time.perf_counter() > deadline or server_process.poll() is not None:
+                    raise RuntimeError("MultiServer did not start")
+                await asyncio.sleep(0.5)
+
+        connect_start = time.perf_counter()
+        await asyncio.gather(*(client.connect(timeout) for client in simulated_clients))
+        logger.info(f"{clients} clients connected in {time.perf_counter() - connect_start:.2f} seconds.")
+
+        start = asyncio.Event()
+        end_time = time.perf_counter() + duration + 1
+        tasks = [asyncio.create_task(run_client(client, start, end_time, Random(r.random())))
+                 for client in simulated_clients]
+        await asyncio.sleep(1)  # warm up, until operations of all clients are running
+        start.set()
+        measured = end_time - time.perf_counter()  # operations started until end_time are counted
+        await asyncio.gather(*tasks)
+        await asyncio.gather(*(client.disconnect() for client in simulated_clients))
+        return measured
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        multidata_path = os.path.join(temp_dir, "AP_LoadTest.archipelago")
+        write_multidata(multidata_path, slots, locations_per_slot)
+        server_process = subprocess.Popen(
+            [sys.executable, local_path("MultiServer.py"), multidata_path, "--host", "127.0.0.1", "--port", str(port),
+             "--disable_save", "--loglevel", "warning", "--location_check_points", "1", "--hint_cost", "0"],
+            stdin=subprocess.DEVNULL, env={**os.environ, "SKIP_REQUIREMENTS_UPDATE": "1"})
+        try:
+            measured = asyncio.run(run_clients())
+        finally:
+            server_process.terminate()
+            server_process.wait()
+
+    logger.info(f"{slots} slots, {clients} clients, {locations_per_slot} locations per slot, "
+                f"{measured:.1f} seconds measured.")
+    for operation in rates:
+        durations = sorted(latencies[operation])
+        if not durations:
+            continue
+
+        def quantile(q: float) -> float:
+            return durations[min(len(durations) - 1, int(q * len(durations)))] * 1000
+
+        logger.info(f"{operation}: {len(durations) / measured:.1f}/s, mean {sum(durations) / len(durations) * 1000:.2f}"
+                    f" ms, p50 {quantile(0.5):.2f} ms, p95 {quantile(0.95):.2f} ms, p99 {quantile(0.99):.2f} ms, "
+                    f"max {durations[-1] * 1000:.2f} ms, {timeouts[operation]} timed out")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from path_change import change_home
+    change_home()
+
+    parser = argparse.ArgumentParser(description="Load test MultiServer with simulated clients.")
+    parser.add_argument("--slots", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--locations", type=int, default=500, help="locations per slot")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to measure")
+    parser.add_argument("--timeout", type=float, default=10, help="seconds until an operation counts as timed out")
+    for operation, rate in default_rates.items():
+        parser.add_argument(f"--{operation.lower()}_rate", type=float, default=rate,
+                            help=f"{operation} per second per client, 0 to disable")
+    args = parser.parse_args()
+    run_server_load_benchmark(args.slots, args.clients, args.locations, args.duration,
+                              {operation: getattr(args, f"{operation.lower()}_rate") for operation in default_rates
+                               if getattr(args, f"{operation.lower()}_rate") > 0},
+                              args.timeout)
@@ -1,11 +1,12 @@
-from typing import List, Iterable
+from typing import Iterator, List, Iterable, Sequence, Set
 import unittest
+from unittest import mock
 
 from Options import Accessibility
 from test.general import generate_items, generate_locations, generate_test_multiworld
 from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
-    distribute_early_items, distribute_items_restrictive
-from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
+    distribute_early_items, distribute_items_restrictive, swept_prefix_states
+from BaseClasses import CollectionState, Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
     ItemClassification
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
 
@@ -243,6 +244,27 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertEqual(locations[2].item, items[0])
         self.assertEqual(locations[3].item, items[3])
 
+    def test_long_chain_fill(self):
+        """Test that fill keeps track of placed items that unlock locations for later placements"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 10, 10)
+        player2 = generate_player_data(multiworld, 2, 10, 10)
+
+        for player in (player1, player2):
+            for location, item in zip(player.locations[1:], player.prog_items):
+                set_rule(location, lambda state, name=item.name, p=player.id: state.has(name, p))
+            multiworld.completion_condition[player.id] = \
+                lambda state, p=player: state.has_all(names(p.prog_items), p.id)
+
+        fill_restrictive(multiworld, multiworld.state, player1.locations + player2.locations,
+                         player1.prog_items + player2.prog_items)
+
+        state = multiworld.state.copy()
+        state.sweep_for_advancements()
+        self.assertTrue(multiworld.can_beat_game(state))
+        for location in player1.locations + player2.locations:
+            self.assertTrue(location.can_reach(state), f"{location} can't be reached")
+
     def test_impossible_fill(self):
         """Test that fill raises an error when it can't place any items"""
         multiworld = generate_test_multiworld()
@@ -880,3 +902,59 @@ class TestBalanceMultiworldProgression(unittest.TestCase):
 
         self.assertRegionContains(
             self.player1.regions[2], self.player2.prog_items[0])
+
+    def test_swept_prefix_states(self) -> None:
+        """Tests that the prefix states are the same as sweeping after collecting each prefix into a fresh state"""
+        state = CollectionState(self.multiworld)
+        locations = set(self.multiworld.get_unfilled_locations()) | {
+            location for location in self.multiworld.get_locations() if location.player == self.player1.id}
+        items = [item.location for item in self.player1.basic_items[:10] + self.player2.prog_items
+                 if item.location]
+        for length in (0, 1, 2, 3, 4, len(items)):
+            with self.subTest(length=length):
+                prefix_states = list(swept_prefix_states(state, locations, items[:length]))
+                self.assertEqual(len(prefix_states), length + 1)
+                for prefix_length, prefix_state in zip(range(length, -1, -1), prefix_states):
+                    expected = state.copy()
+                    for location in items[:prefix_length]:
+                        expected.collect(location.item, True, location)
+                    expected.sweep_for_advancements(locations=locations)
+                    self.assertEqual(prefix_state.prog_items, expected.prog_items)
+                    self.assertEqual(prefix_state.advancements, expected.advancements)
+
+    def test_balancing_unchanged_by_prefix_states(self) -> None:
+        """Tests that balancing with reused prefix states places items the same as sweeping each test from scratch"""
+        def placements() -> List[str]:
+            return [f"{location.name}: {location.item}" for location in self.multiworld.get_filled_locations()]
+
+        def fresh_prefix_states(base_state: CollectionState, locations: Set[Location],
+                                items: Sequence[Location]) -> Iterator[CollectionState]:
+            for length in range(len(items), -1, -1):
+                state = base_state.copy()
+                for location in items[:length]:
+                    state.collect(location.item, True, location)
+                state.sweep_for_advancements(locations=locations)
+                yield state
+
+        results = []
+        for prefix_states in (swept_prefix_states, fresh_prefix_states):
+            # many of player 2's progression items are late in player 1's world, to make many candidates to test
+            self.multiworld = generate_test_multiworld(2)
+            player1 = generate_player_data(self.multiworld, 1, prog_item_count=2, basic_item_count=40)
+            player2 = generate_player_data(self.multiworld, 2, prog_item_count=16, basic_item_count=40)
+            for player in (player1, player2):
+                self.multiworld.completion_condition[player.id] = \
+                    lambda state, player=player: all(state.has(item.name, player.id) for item in player.prog_items)
+                self.multiworld.worlds[player.id].options.progression_balancing.value = 99
+            items = fill_region(self.multiworld, player1.generate_region(player1.menu, 20),
+                                [player1.prog_items[0]] + player1.basic_items)
+            items = fill_region(self.multiworld, player1.generate_region(
+                player1.regions[1], 40, lambda state: state.has(player1.prog_items[0].name, player1.id)),
+                [player1.prog_items[1]] + player2.prog_items + items + player2.basic_items)
+            fill_region(self.multiworld, player2.generate_region(
+                player2.menu, 38, lambda state: state.has(player2.prog_items[0].name, player2.id)), items)
+            self.multiworld.random.seed(0)
+            with mock.patch("Fill.swept_prefix_states", prefix_states):
+                balance_multiworld_progression(self.multiworld)
+            results.append(placements())
+        self.assertEqual(results[0], results[1])
@@ -0,0 +1,54 @@
+import multiprocessing
+import unittest
+
+from BaseClasses import MultiWorld
+from worlds.AutoWorld import AutoWorldRegister, call_all, call_all_parallel, parallel_stages
+from . import setup_multiworld
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "needs fork")
+class TestParallelGeneration(unittest.TestCase):
+    game = "ChecksFinder"
+
+    def generate(self, workers: int) -> MultiWorld:
+        multiworld = setup_multiworld([AutoWorldRegister.world_types[self.game]] * 3, (), seed=1)
+        for world in multiworld.worlds.values():
+            world.parallel_generation = True
+        for step in ("generate_early", "create_regions", "create_items", "set_rules"):
+            self.assertIn(step, parallel_stages)
+            call_all_parallel(multiworld, step, workers)
+        call_all(multiworld, "connect_entrances")
+        return multiworld
+
+    def test_matches_serial(self):
+        """Test that running the stages in workers results in the same regions, items and reachability."""
+        serial = self.generate(0)
+        parallel = self.generate(2)
+        for player in serial.player_ids:
+            with self.subTest(player=player):
+                self.assertEqual([(region.name, [exit_.name for exit_ in region.exits],
+                                   [location.name for location in region.locations])
+                                  for region in serial.get_regions(player)],
+                                 [(region.name, [exit_.name for exit_ in region.exits],
+                                   [location.name for location in region.locations])
+                                  for region in parallel.get_regions(player)])
+                self.assertEqual([location.name for location in serial.get_reachable_locations(player=player)],
+                                 [location.name for location in parallel.get_reachable_locations(player=player)])
+        self.assertEqual([(item.name, item.player) for item in serial.itempool],
+                         [(item.name, item.player) for item in parallel.itempool])
+
+    def test_installed_objects_are_linked(self):
+        """Test that objects sent back by workers refer to the objects of the generating process."""
+        multiworld = self.generate(2)
+        for player in multiworld.player_ids:
+            world = multiworld.worlds[player]
+            self.assertIs(world.multiworld, multiworld)
+            for region in multiworld.get_regions(player):
+                self.assertIs(region.multiworld, multiworld)
+                for location in region.locations:
+                    self.assertIs(location.parent_region, region)
+                    self.assertIs(multiworld.get_location(location.name, player), location)
+                for exit_ in region.exits:
+                    self.assertIs(exit_.parent_region, region)
+                    self.assertIs(multiworld.get_region(exit_.connected_region.name, player),
+                                  exit_.connected_region)
@@ -1,7 +1,12 @@
 import unittest
+from collections import Counter
+from typing import Iterable, List, Optional, Set
 
+from BaseClasses import CollectionState, Item, ItemClassification, Location, Region
+from Fill import FillError
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from worlds.generic.Rules import CollectionRule
+from . import generate_test_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -27,3 +32,284 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+
+class TestIncrementalReachability(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.world = self.multiworld.worlds[1]
+        self.world.incremental_reachability = True
+        self.menu = self.multiworld.get_region("Menu", 1)
+        self.rule_calls = Counter()
+        self.regions = {name: Region(name, 1, self.multiworld) for name in ("A", "B", "C", "D")}
+        self.multiworld.regions += self.regions.values()
+        self.menu.connect(self.regions["A"], "To A", self.counted("A", lambda state: state.has("Key A", 1)))
+        self.regions["A"].connect(self.regions["B"], "To B",
+                                  self.counted("B", lambda state: state.has("Key B", 1, 2)))
+        self.menu.connect(self.regions["C"], "To C", self.counted("C", lambda state: state.has("Key C", 1)))
+        to_d = self.menu.connect(self.regions["D"], "To D",
+                                 self.counted("D", lambda state: state.can_reach_region("A", 1)))
+        self.multiworld.register_indirect_condition(self.regions["A"], to_d)
+
+    def counted(self, name: str, rule: CollectionRule) -> CollectionRule:
+        def counted_rule(state: CollectionState) -> bool:
+            self.rule_calls[name] += 1
+            return rule(state)
+        return counted_rule
+
+    def collect(self, state: CollectionState, name: str) -> None:
+        state.collect(Item(name, ItemClassification.progression, None, 1), True)
+
+    def reachable(self, state: CollectionState) -> set:
+        return {name for name, region in self.regions.items() if region.can_reach(state)}
+
+    def test_matches_full_search(self) -> None:
+        """Tests that incremental updates find the same regions as a full search after each collected item"""
+        state = CollectionState(self.multiworld)
+        self.assertEqual(self.reachable(state), set())
+        for name, expected in (("Key B", set()), ("Key B", set()), ("Key A", {"A", "B", "D"}),
+                               ("Key C", {"A", "B", "C", "D"})):
+            self.collect(state, name)
+            self.assertEqual(self.reachable(state), expected)
+            self.world.incremental_reachability = False
+            full_state = state.copy()
+            full_state.reachable_regions[1] = set()
+            full_state.blocked_connections[1] = set()
+            self.assertEqual(self.reachable(full_state), expected)
+            self.world.incremental_reachability = True
+
+    def test_only_dependent_rules_rechecked(self) -> None:
+        """Tests that collecting an item only rechecks blocked entrances whose rules read that item"""
+        state = CollectionState(self.multiworld)
+        self.reachable(state)
+        self.assertEqual(self.rule_calls, {"A": 1, "C": 1, "D": 1})
+        self.collect(state, "Key C")
+        self.reachable(state)
+        self.assertEqual(self.rule_calls, {"A": 1, "C": 2, "D": 1})
+        copied_state = state.copy()
+        self.collect(copied_state, "Key A")
+        self.assertEqual(self.reachable(copied_state), {"A", "C", "D"})
+        self.assertEqual(self.rule_calls, {"A": 2, "B": 1, "C": 2, "D": 2})
+        self.assertEqual(self.reachable(state), {"C"})
+
+    def test_sweep_rechecks_dependent_locations(self) -> None:
+        """Tests that sweeps only check locations again once something their reachability depends on changed"""
+        def add_location(region: Region, name: str, item: str, rule: CollectionRule) -> None:
+            location = Location(1, name, None, region)
+            location.access_rule = self.counted(name, rule)
+            location.place_locked_item(Item(item, ItemClassification.progression, None, 1))
+            region.locations.append(location)
+
+        add_location(self.menu, "Free", "Key A", lambda state: True)
+        add_location(self.menu, "Needs C", "Key B", lambda state: state.has("Key C", 1))
+        add_location(self.regions["A"], "Needs B", "Key B", lambda state: state.has("Key B", 1))
+        add_location(self.menu, "Needs Region B", "Key C", lambda state: state.can_reach_region("B", 1))
+
+        state = CollectionState(self.multiworld)
+        state.sweep_for_advancements()
+        self.assertEqual(state.prog_items[1], Counter({"Key A": 1}))
+        self.assertEqual(self.rule_calls["Needs C"], 1)
+        self.assertEqual(self.rule_calls["Needs Region B"], 2)
+
+        self.world.incremental_reachability = False
+        full_state = CollectionState(self.multiworld)
+        full_state.sweep_for_advancements()
+        self.assertEqual(full_state.prog_items, state.prog_items)
+        self.assertEqual(full_state.advancements, state.advancements)
+
+    def test_spheres_recheck_dependent_locations(self) -> None:
+        """Tests that sphere searches only check locations again once something they depend on changed, and are
+        cached until the placement changes"""
+        locations = {}
+        for region, name, item, rule in ((self.menu, "Free", "Key A", lambda state: True),
+                                         (self.menu, "Needs C", "Key B", lambda state: state.has("Key C", 1)),
+                                         (self.regions["A"], "Needs A", "Key C", lambda state: True),
+                                         (self.menu, "Needs B", "Filler", lambda state: state.has("Key B", 1))):
+            location = locations[name] = Location(1, name, None, region)
+            location.access_rule = self.counted(name, rule)
+            location.place_locked_item(Item(item, ItemClassification.progression, None, 1))
+            region.locations.append(location)
+
+        spheres = [{location.name for location in sphere} for sphere in self.multiworld.get_spheres()]
+        self.assertEqual(spheres, [{"Free"}, {"Needs A"}, {"Needs C"}, {"Needs B"}])
+        self.assertEqual(self.rule_calls["Needs B"], 2)
+        self.assertEqual(list(self.multiworld.get_spheres()), [{locations[name]} for name in
+                                                               ("Free", "Needs A", "Needs C", "Needs B")])
+        self.assertEqual(self.rule_calls["Needs B"], 2)
+
+        self.world.incremental_reachability = False
+        self.assertEqual([{location.name for location in sphere} for sphere in self.multiworld.get_spheres()],
+                         spheres)
+        self.assertEqual(self.rule_calls["Needs B"], 6)
+
+        key_b = locations["Needs C"].item
+        locations["Needs C"].item = locations["Needs B"].item
+        locations["Needs B"].item = key_b
+        self.assertEqual([{location.name for location in sphere} for sphere in self.multiworld.get_spheres()],
+                         [{"Free"}, {"Needs A"}, {"Needs C"}, set(), {"Needs B"}])
+
+    def test_remove(self) -> None:
+        """Tests that removing an item drops regions that are no longer reachable"""
+        state = CollectionState(self.multiworld)
+        key = Item("Key A", ItemClassification.progression, None, 1)
+        state.collect(key, True)
+        self.assertEqual(self.reachable(state), {"A", "D"})
+        state.remove(key)
+        self.assertEqual(self.reachable(state), set())
+
+
+class TestSphereSearch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.menu = self.multiworld.get_region("Menu", 1)
+        self.add_location("Event", None, Item("Key", ItemClassification.progression, None, 1), lambda state: True)
+        self.add_location("Sendable", 1, Item("Key 2", ItemClassification.progression, 1, 1),
+                          lambda state: state.has("Key", 1))
+        self.add_location("Last", 2, Item("Filler", ItemClassification.filler, 2, 1),
+                          lambda state: state.has("Key 2", 1))
+        self.multiworld.completion_condition[1] = lambda state: state.has("Key 2", 1)
+
+    def add_location(self, name: str, address: Optional[int], item: Item, rule: CollectionRule) -> None:
+        location = Location(1, name, address, self.menu)
+        location.access_rule = rule
+        location.place_locked_item(item)
+        self.menu.locations.append(location)
+
+    def spheres(self, spheres: Iterable[Set[Location]]) -> List[Set[str]]:
+        return [{location.name for location in sphere} for sphere in spheres]
+
+    def test_sendable_spheres_collect_events(self) -> None:
+        """Tests that events are collected as soon as they can be reached instead of making up spheres"""
+        self.assertEqual(self.spheres(self.multiworld.get_spheres()), [{"Event"}, {"Sendable"}, {"Last"}])
+        self.assertEqual(self.spheres(self.multiworld.get_sendable_spheres()), [{"Sendable"}, {"Last"}])
+        self.add_location("Locked", 3, Item("Filler", ItemClassification.filler, 2, 1), lambda state: False)
+        self.assertEqual(self.spheres(self.multiworld.get_sendable_spheres()),
+                         [{"Sendable"}, {"Last"}, set(), {"Locked"}])
+
+    def test_sphere_search_cache_key(self) -> None:
+        """Tests that replacing an item by an equal one or changing its classification invalidates the cached search"""
+        self.assertEqual(self.spheres(self.multiworld.get_spheres()), [{"Event"}, {"Sendable"}, {"Last"}])
+        event = self.multiworld.get_location("Event", 1)
+        assert event.item
+        event.item.classification = ItemClassification.filler
+        self.assertEqual(self.spheres(self.multiworld.get_spheres()), [{"Event"}, set(), {"Sendable", "Last"}])
+        event.item = Item("Key", ItemClassification.progression, None, 1)
+        self.assertEqual(self.spheres(self.multiworld.get_spheres()), [{"Event"}, {"Sendable"}, {"Last"}])
+
+    def test_sphere_search_cache_world_flags(self) -> None:
+        """Tests that changing how a world's regions are searched invalidates the cached search"""
+        search = self.multiworld.search_spheres(False)
+        self.assertIs(self.multiworld.search_spheres(False), search)
+        self.multiworld.worlds[1].explicit_indirect_conditions = False
+        self.assertIsNot(self.multiworld.search_spheres(False), search)
+
+    def test_accessibility_from_sphere_search(self) -> None:
+        """Tests that the accessibility check using the cached sphere search agrees with a check from a given state"""
+        self.assertTrue(self.multiworld.fulfills_accessibility())
+        self.assertTrue(self.multiworld.fulfills_accessibility(CollectionState(self.multiworld)))
+        self.add_location("Locked", None, Item("Event 2", ItemClassification.progression, None, 1),
+                          lambda state: False)
+        with self.assertRaises(FillError):
+            self.multiworld.fulfills_accessibility()
+        with self.assertRaises(FillError):
+            self.multiworld.fulfills_accessibility(CollectionState(self.multiworld))
+
+    def test_playthrough_from_sphere_search(self) -> None:
+        """Tests that the playthrough is built from the progression items of the cached sphere search"""
+        self.multiworld.spoiler.create_playthrough(create_paths=False)
+        self.assertEqual(list(self.multiworld.spoiler.playthrough), ["0", "1", "2"])
+        self.assertIsNone(self.multiworld.sphere_cache[False].states)
+        self.assertEqual(self.spheres(self.multiworld.get_spheres()), [{"Event"}, {"Sendable"}, {"Last"}])
+
+    def test_playthrough_culls_groups(self) -> None:
+        """Tests that culling groups of locations keeps exactly the locations required to beat the game"""
+        for index in range(5):
+            self.add_location(f"Spare {index}", 10 + index, Item(f"Spare {index}", ItemClassification.progression,
+                                                                 10 + index, 1), lambda state: True)
+        self.multiworld.spoiler.create_playthrough(create_paths=False)
+        self.assertEqual(self.multiworld.spoiler.playthrough,
+                         {"0": [], "1": {"Event": "Key"}, "2": {"Sendable": "Key 2"}})
+
+    def test_playthrough_time_limit(self) -> None:
+        """Tests that running out of time keeps the locations that were not checked yet in the playthrough"""
+        self.add_location("Spare", 10, Item("Spare", ItemClassification.progression, 10, 1), lambda state: True)
+        self.multiworld.spoiler.create_playthrough(create_paths=False, time_limit=-1)
+        self.assertEqual(self.multiworld.spoiler.playthrough["1"], {"Event": "Key", "Spare": "Spare"})
+
+
+class TestStateCopy(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+        for player in self.multiworld.player_ids:
+            menu = self.multiworld.get_region("Menu", player)
+            region = Region("Locked", player, self.multiworld)
+            self.multiworld.regions.append(region)
+            menu.connect(region, "To Locked", lambda state, p=player: state.has("Key", p))
+
+    def collect(self, state: CollectionState, player: int) -> None:
+        state.collect(Item("Key", ItemClassification.progression, None, player), True)
+
+    def test_copy_is_independent(self) -> None:
+        """Tests that modifying a copied state does not modify the state it was copied from, and vice versa"""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(state.can_reach_region("Locked", 1))
+        copied_state = state.copy()
+        self.collect(copied_state, 1)
+        self.assertTrue(copied_state.can_reach_region("Locked", 1))
+        self.assertFalse(state.can_reach_region("Locked", 1))
+        self.assertFalse(state.has("Key", 1))
+
+        self.collect(state, 2)
+        self.assertTrue(state.can_reach_region("Locked", 2))
+        self.assertFalse(copied_state.can_reach_region("Locked", 2))
+        self.assertFalse(copied_state.has("Key", 2))
+
+    def test_copy_compares_equal(self) -> None:
+        """Tests that the items of a copied state compare equal to the original until either of them is modified"""
+        state = CollectionState(self.multiworld)
+        self.collect(state, 1)
+        copied_state = state.copy()
+        self.assertEqual(state.prog_items, copied_state.prog_items)
+        self.assertEqual(copied_state.prog_items, {1: Counter({"Key": 1}), 2: Counter()})
+        self.collect(copied_state, 2)
+        self.assertNotEqual(state.prog_items, copied_state.prog_items)
+
+
+class TestCompactItemCounts(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.world = self.multiworld.worlds[1]
+        self.world.compact_item_counts = True
+        menu = self.multiworld.get_region("Menu", 1)
+        event = Location(1, "Event Location", None, menu)
+        menu.locations.append(event)
+        event.place_locked_item(Item("Event", ItemClassification.progression, None, 1))
+        self.multiworld.itempool += [Item("Key", ItemClassification.progression, 1, 1),
+                                     Item("Junk", ItemClassification.filler, 2, 1)]
+        call_all(self.multiworld, "create_items")
+
+    def test_progression_names_indexed(self) -> None:
+        """Tests that only progression item names are indexed after create_items"""
+        self.assertEqual(set(self.world.item_name_indices), {"Event", "Key"})
+
+    def test_counter_api(self) -> None:
+        """Tests that item counts kept in an array still behave like a Counter"""
+        state = CollectionState(self.multiworld)
+        key = Item("Key", ItemClassification.progression, 1, 1)
+        state.collect(key, True)
+        state.collect(key, True)
+        state.prog_items[1]["Custom Count"] += 100000
+        self.assertTrue(state.has("Key", 1, 2))
+        self.assertEqual(state.count("Event", 1), 0)
+        self.assertEqual(state.prog_items[1], Counter({"Key": 2, "Custom Count": 100000}))
+        self.assertEqual(len(state.prog_items[1]), 2)
+
+        copied_state = state.copy()
+        copied_state.remove(key)
+        copied_state.prog_items[1]["Key"] += 70000
+        self.assertEqual(copied_state.count("Key", 1), 70001)
+        self.assertEqual(state.count("Key", 1), 2)
+        state.remove(key)
+        state.remove(key)
+        self.assertNotIn("Key", state.prog_items[1])
+        self.assertEqual(list(state.prog_items[1]), ["Custom Count"])
@@ -0,0 +1,32 @@
+# Tests for NetUtils.encode
+import unittest
+
+from NetUtils import (decode, encode, _encode, _scan_for_TypedTuples, Hint, HintStatus, NetworkItem, NetworkPlayer,
+                      NetworkSlot, SlotType)
+
+
+class TestEncode(unittest.TestCase):
+    def assert_encodes_like_scan(self, obj: object) -> None:
+        self.assertEqual(encode(obj), _encode(_scan_for_TypedTuples(obj)))
+
+    def test_typed_tuples(self) -> None:
+        """Tests that NamedTuples are encoded as objects naming their class, and decode back to themselves"""
+        items = [NetworkItem(1, 2, 3, 4), NetworkItem(5, 6, 7)]
+        message = [{"cmd": "ReceivedItems", "index": 0, "items": items},
+                   {"players": [NetworkPlayer(0, 1, "Alias", "Näme")],
+                    "slot_info": {1: NetworkSlot("Näme", "Game", SlotType.group, [2, 3])}},
+                   {"hints": [Hint(1, 2, 3, 4, False, "", 0, HintStatus.HINT_FOUND)]}]
+        self.assert_encodes_like_scan(message)
+        self.assertEqual(decode(encode(message))[0]["items"], items)
+
+    def test_base_types(self) -> None:
+        """Tests that sets, non-string keys and values orjson can't serialize are encoded like json does"""
+        self.assert_encodes_like_scan({"checked": {1, 2}, "missing": frozenset(), "keys": {1: None, True: 1.5},
+                                       "text": "\"ü\"\n", "big": 2 ** 70})
+        with self.assertRaises(TypeError):
+            encode({"object": object()})
+
+    def test_non_finite_floats(self) -> None:
+        """Tests that NaN and infinite floats, which are not valid JSON, are encoded as null"""
+        self.assertEqual(encode([float("nan"), float("inf"), -float("inf"), 1.5]), "[null,null,null,1.5]")
+        self.assertEqual(decode(encode({"cmd": "SetReply", "value": float("nan")})), {"cmd": "SetReply", "value": None})
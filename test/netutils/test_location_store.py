@@ -165,6 +165,37 @@ class Base:
             with self.assertRaises(KeyError):
                 self.store.get_remaining(bad_state, 0, 9999)
 
+        def test_mark_checked(self) -> None:
+            self.store.mark_checked(0, 1, [12, 99])  # 99 does not exist for slot 1
+            self.assertEqual(self.store.get_checked(None, 0, 1), [12])
+            self.assertEqual(self.store.get_missing(None, 0, 1), [11, 13])
+            self.assertEqual(self.store.get_remaining(None, 0, 1), [(1, 13), (2, 21)])
+            # other slots and teams are not affected
+            self.assertEqual(self.store.get_checked(None, 0, 2), [])
+            self.assertEqual(self.store.get_missing(None, 1, 1), [11, 12, 13])
+            self.store.mark_checked(0, 3, [9])
+            self.assertEqual(self.store.get_checked(None, 0, 3), [9])
+            self.assertEqual(self.store.get_missing(None, 0, 3), [])
+
+        def test_mark_checked_exception(self) -> None:
+            with self.assertRaises(KeyError):
+                self.store.mark_checked(0, 9999, [1])
+            with self.assertRaises(KeyError):
+                self.store.get_checked(None, 0, 9999)
+
+        def test_mark_checked_many(self) -> None:
+            # spans multiple bitmap words that are not aligned to players
+            store = type(self.store)({
+                player: {location: (location, player, 0) for location in range(player * 1000, player * 1000 + 97)}
+                for player in range(1, 4)
+            })
+            checked = {player: set(range(player * 1000 + player, player * 1000 + 97, 3)) for player in range(1, 4)}
+            for player, locations in checked.items():
+                store.mark_checked(0, player, locations)
+            for player, locations in checked.items():
+                self.assertEqual(store.get_checked(None, 0, player), sorted(locations))
+                self.assertEqual(store.get_missing(None, 0, player), sorted(set(store[player]) - locations))
+
         def test_location_set_intersection(self) -> None:
             locations = {10, 11, 12}
             locations.intersection_update(self.store[1])
@@ -1,5 +1,31 @@
+import asyncio
+import copy
+import os
+import tempfile
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+from unittest import mock
+
+from typing_extensions import override
+
+from MultiServer import (Client, Context, DurationHistogram, ServerCommandProcessor, ServerMetrics,
+                         register_location_checks, send_items_to, send_new_items, serve_metrics)
+from NetUtils import GamesPackage, Hint, HintStatus, LocationStore, NetworkItem, NetworkSlot, SlotType, decode
+
+
+class ContextTestCase(unittest.TestCase):
+    """Provides a Context without a multidata as ctx."""
+    ctx: Context
+
+    @staticmethod
+    def create_context() -> Context:
+        # the data package is only needed for names, and can only be loaded by one context
+        with mock.patch.object(Context, "_load_game_data"):
+            return Context("", 0, "", "", 0, 0, False)
+
+    @override
+    def setUp(self) -> None:
+        self.ctx = self.create_context()
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +64,362 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class FakeTransport:
+    write_buffer_size = 0
+
+    def get_write_buffer_size(self) -> int:
+        return self.write_buffer_size
+
+
+class FakeSocket:
+    """Records the decoded messages sent to it."""
+    open = True
+
+    def __init__(self, sent: typing.List[typing.Tuple["FakeSocket", typing.Any]]) -> None:
+        self.transport = FakeTransport()
+        self.sent = sent
+
+    async def send(self, msg: str) -> None:
+        self.sent.append((self, decode(msg)))
+
+
+class ConnectedContextTestCase(ContextTestCase, unittest.IsolatedAsyncioTestCase):
+    """Provides a Context with a client per slot of team 0 connected to a FakeSocket, recording what they get sent."""
+    slots: typing.ClassVar[typing.Tuple[int, ...]] = (1, 2)
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+        self.sent: typing.List[typing.Tuple[FakeSocket, typing.Any]] = []
+        self.sockets: typing.Dict[int, FakeSocket] = {}
+        self.clients: typing.Dict[int, Client] = {}
+        for slot in self.slots:
+            socket = self.sockets[slot] = FakeSocket(self.sent)
+            client = self.clients[slot] = Client(typing.cast(typing.Any, socket), self.ctx)
+            client.team, client.slot, client.auth = 0, slot, True
+            self.ctx.clients.setdefault(0, {})[slot] = [client]
+            self.ctx.endpoints.append(client)
+
+        def broadcast(sockets: typing.Iterable[FakeSocket], msg: str) -> None:
+            for socket in sockets:
+                self.sent.append((socket, decode(msg)))
+
+        patcher = mock.patch("MultiServer.websockets.broadcast", broadcast)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestSendNewItems(ConnectedContextTestCase):
+    slots = (1, 2, 3)
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+        self.ctx.groups = {3: {1, 2}}
+
+    async def test_only_receiving_slots_sent(self) -> None:
+        """Tests that new items are only sent to the clients of the slots that received them"""
+        send_items_to(self.ctx, 0, 1, NetworkItem(1, 1, 2, 0))
+        send_new_items(self.ctx)
+        await asyncio.sleep(0)  # let the queued messages get sent
+        self.assertEqual(self.sent, [(self.sockets[1], [{"cmd": "ReceivedItems", "index": 0,
+                                                          "items": [NetworkItem(1, 1, 2, 0)]}])])
+        self.assertEqual(self.clients[2].send_index, 0)
+        self.assertFalse(self.ctx.pending_items)
+
+    async def test_group_items_sent_to_members(self) -> None:
+        """Tests that items sent to a group are sent to the clients of all of its members"""
+        send_items_to(self.ctx, 0, 3, NetworkItem(1, 1, 1, 0), NetworkItem(2, 2, 1, 0))
+        send_new_items(self.ctx)
+        self.assertEqual(self.clients[1].send_index, 2)
+        self.assertEqual(self.clients[2].send_index, 2)
+        self.assertEqual(self.clients[3].send_index, 0)
+
+
+class TestBroadcast(ConnectedContextTestCase):
+    async def test_coalesced(self) -> None:
+        """Tests that the broadcasts of a tick are sent as one frame per client, in order"""
+        self.ctx.broadcast_text_all("first")
+        self.ctx.broadcast([self.clients[1]], [{"cmd": "RoomUpdate", "hint_points": 1}])
+        self.ctx.broadcast_team(0, [{"cmd": "PrintJSON", "data": [{"text": "second"}]}])
+        self.assertEqual(self.sent, [])
+        await asyncio.sleep(0)
+        first = {"cmd": "PrintJSON", "data": [{"text": "first"}]}
+        second = {"cmd": "PrintJSON", "data": [{"text": "second"}]}
+        self.assertEqual(self.sent, [
+            (self.sockets[1], [first, {"cmd": "RoomUpdate", "hint_points": 1}, second]),
+            (self.sockets[2], [first, second]),
+        ])
+        self.assertFalse(self.ctx.pending_broadcasts)
+
+    async def test_full_write_buffer_held_back(self) -> None:
+        """Tests that broadcasts to a client with a full write buffer are sent once it has room again"""
+        self.ctx.broadcast_retry_delay = 0
+        self.sockets[2].transport.write_buffer_size = self.ctx.broadcast_write_buffer_limit + 1
+        self.ctx.broadcast_text_all("first")
+        await asyncio.sleep(0)
+        self.ctx.broadcast_text_all("second")
+        await asyncio.sleep(0)
+        self.assertEqual([socket for socket, _ in self.sent], [self.sockets[1]] * 2)
+        self.sockets[2].transport.write_buffer_size = 0
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.sent[2:], [(self.sockets[2], [{"cmd": "PrintJSON", "data": [{"text": "first"}]},
+                                                            {"cmd": "PrintJSON", "data": [{"text": "second"}]}])])
+        self.assertFalse(self.ctx.pending_broadcasts)
+
+    async def test_send_after_broadcast(self) -> None:
+        """Tests that queued broadcasts are sent before a message that is sent directly afterwards"""
+        self.ctx.broadcast_text_all("first")
+        await self.ctx.send_msgs(self.clients[1], [{"cmd": "RoomUpdate", "hint_points": 1}])
+        self.assertEqual(self.sent, [
+            (self.sockets[1], [{"cmd": "PrintJSON", "data": [{"text": "first"}]}]),
+            (self.sockets[2], [{"cmd": "PrintJSON", "data": [{"text": "first"}]}]),
+            (self.sockets[1], [{"cmd": "RoomUpdate", "hint_points": 1}]),
+        ])
+
+    async def test_check_order(self) -> None:
+        """Tests that a client gets the messages about its check in the order the check sends them"""
+        self.ctx.locations = LocationStore({1: {1: (10, 1, 0)}, 2: {}})
+        self.ctx.slot_info = {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player) for slot in (1, 2)}
+        self.ctx.player_names = {(0, slot): f"Player{slot}" for slot in (1, 2)}
+        self.clients[1].remote_items = True  # receives the items of its own world
+        register_location_checks(self.ctx, 0, 1, [1])
+        await asyncio.sleep(0)
+        self.assertEqual([(socket, [msg["cmd"] for msg in msgs]) for socket, msgs in self.sent], [
+            (self.sockets[1], ["PrintJSON", "ReceivedItems", "RoomUpdate"]),
+            (self.sockets[2], ["PrintJSON"]),
+        ])
+
+
+class TestSaveJournal(ContextTestCase):
+    @override
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.save_filename = os.path.join(self.directory.name, "test.apsave")
+        self.ctx = self.create_save_context()
+
+    @override
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def create_save_context(self) -> Context:
+        ctx = self.create_context()
+        ctx.locations = LocationStore({1: {}, 2: {location: (location, 1, 0) for location in (1, 2, 3)}})
+        ctx.slot_info = {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player) for slot in (1, 2)}
+        ctx.player_names = {(0, slot): f"Player{slot}" for slot in (1, 2)}
+        ctx.clients = {0: {1: [], 2: []}}
+        ctx.save_filename = self.save_filename
+        ctx.saving = True
+        return ctx
+
+    def make_changes(self, ctx: Context, location: int) -> None:
+        register_location_checks(ctx, 0, 2, [location])
+        ctx.notify_hints(0, [Hint(1, 2, location + 1, location + 1, False, "", 0, HintStatus.HINT_PRIORITY)])
+        ctx.stored_data[f"key {location}"] = [location]
+        ctx.unsaved_stored_data.add(f"key {location}")
+        ctx.client_game_state[0, 1] = location
+
+    def save(self) -> None:
+        self.assertTrue(self.ctx.save(now=True))
+
+    @staticmethod
+    def get_save(ctx: Context) -> typing.Dict[str, typing.Any]:
+        # reading the checked locations or hints of a slot adds an empty entry, which is the same as a missing one
+        save = ctx.get_save()
+        for section in ("location_checks", "hints"):
+            save[section] = {key: value for key, value in save[section].items() if value}
+        return save
+
+    def assert_loads_same(self) -> None:
+        loaded = self.create_save_context()
+        loaded.set_save(loaded.read_save())
+        self.assertEqual(self.get_save(loaded), self.get_save(self.ctx))
+
+    def test_journal_replayed(self) -> None:
+        """Tests that changes after the snapshot are appended to the journal and applied to the snapshot on load"""
+        self.make_changes(self.ctx, 1)
+        self.save()
+        snapshot_size = os.path.getsize(self.save_filename)
+        for location in (2, 3):
+            self.make_changes(self.ctx, location)
+            self.save()
+        self.assertEqual(os.path.getsize(self.save_filename), snapshot_size)
+        self.assertEqual(self.ctx.get_save_changes(), {})
+        self.assert_loads_same()
+
+    def test_changes_during_save_kept(self) -> None:
+        """Tests that changes made while the saving thread collects the changes are saved with the next entry"""
+        self.save()
+        self.make_changes(self.ctx, 1)
+        test = self
+
+        class StoredData(typing.Dict[str, object]):
+            changed = False
+
+            @override
+            def __getitem__(self, key: str) -> object:
+                if not self.changed:
+                    self.changed = True
+                    # the event loop keeps running while the saving thread reads the changed values
+                    test.make_changes(test.ctx, 2)
+                return super().__getitem__(key)
+
+        self.ctx.stored_data = StoredData(self.ctx.stored_data)
+        self.save()
+        self.ctx.stored_data = dict(self.ctx.stored_data)
+        self.assertIn("key 2", self.ctx.stored_data)
+        self.save()
+        self.assertEqual(self.ctx.get_save_changes(), {})
+        self.assert_loads_same()
+
+    def test_outdated_journal_ignored(self) -> None:
+        """Tests that a journal of an earlier snapshot is not replayed onto a newer snapshot"""
+        self.save()
+        self.make_changes(self.ctx, 1)
+        self.save()
+        with open(self.ctx.save_journal_filename, "rb") as f:
+            journal = f.read()
+        # a server that loaded the save starts with a new snapshot
+        self.ctx = self.create_save_context()
+        self.ctx.set_save(self.ctx.read_save())
+        self.make_changes(self.ctx, 2)
+        self.save()
+        with open(self.ctx.save_journal_filename, "wb") as f:
+            f.write(journal)
+        self.assert_loads_same()
+
+    def test_incomplete_entry_ignored(self) -> None:
+        """Tests that an entry that was not completely written to the journal is ignored"""
+        self.save()
+        self.make_changes(self.ctx, 1)
+        self.save()
+        expected = copy.deepcopy(self.get_save(self.ctx))
+        self.make_changes(self.ctx, 2)
+        self.save()
+        with open(self.ctx.save_journal_filename, "r+b") as f:
+            f.truncate(os.path.getsize(self.ctx.save_journal_filename) - 1)
+        loaded = self.create_save_context()
+        with self.assertLogs(loaded.logger, "WARNING"):
+            loaded.set_save(loaded.read_save())
+        self.assertEqual(self.get_save(loaded), expected)
+
+    def test_checks_of_unknown_slot_loaded(self) -> None:
+        """Tests that a save with checked locations of a slot that has no locations, like from older multidata, loads"""
+        self.make_changes(self.ctx, 1)
+        save = self.ctx.get_save()
+        save["location_checks"][0, 3] = {5}
+        loaded = self.create_save_context()
+        loaded.set_save(save)
+        self.assertEqual(loaded.location_checks[0, 3], {5})
+        self.assertEqual(loaded.locations.get_checked(None, 0, 2), [1])
+
+
+class TestRecheckHints(ContextTestCase):
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+        self.hints = [
+            Hint(2, 1, 10, 1, False, "", 0, HintStatus.HINT_PRIORITY),
+            Hint(2, 1, 11, 2, False, "", 0, HintStatus.HINT_PRIORITY),
+            Hint(1, 2, 10, 3, False, "", 0, HintStatus.HINT_PRIORITY),
+        ]
+        for hint in self.hints:
+            self.ctx.hints[0, hint.finding_player].add(hint)
+            self.ctx.hints[0, hint.receiving_player].add(hint)
+            self.ctx.index_hint(0, hint)
+
+    def test_only_checked_locations_rechecked(self) -> None:
+        """Tests that checking a location only changes the hints for that location in every slot's hints"""
+        self.ctx.location_checks[0, 1].add(10)
+        changed: typing.Set[typing.Tuple[int, int]] = set()
+        self.ctx.recheck_hints(0, 1, changed, [10])
+        found_hint = self.hints[0]._replace(found=True, status=HintStatus.HINT_FOUND)
+        self.assertEqual(changed, {(0, 1), (0, 2)})
+        self.assertEqual(self.ctx.hints[0, 1], {found_hint, self.hints[1], self.hints[2]})
+        self.assertEqual(self.ctx.hints[0, 2], {found_hint, self.hints[1], self.hints[2]})
+        self.assertNotIn(10, self.ctx.unfound_hints[0, 1])
+
+    def test_replaced_hint_rechecked(self) -> None:
+        """Tests that a hint whose status was changed is still found when its location gets checked"""
+        new_hint = self.hints[1]._replace(status=HintStatus.HINT_AVOID)
+        for slot in (1, 2):
+            self.ctx.replace_hint(0, slot, self.hints[1], new_hint)
+        self.ctx.location_checks[0, 1].add(11)
+        self.ctx.recheck_hints()
+        found_hint = new_hint._replace(found=True, status=HintStatus.HINT_FOUND)
+        self.assertEqual(self.ctx.hints[0, 1], {self.hints[0], found_hint, self.hints[2]})
+        self.assertEqual(self.ctx.hints[0, 2], {self.hints[0], found_hint, self.hints[2]})
+
+
+class TestDataPackage(ContextTestCase):
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+        self.ctx.gamespackage = {game: GamesPackage(item_name_to_id={f"{game} Item": 1}, location_name_to_id={},
+                                                    checksum=game) for game in ("Archipelago", "A", "B")}
+        self.ctx.item_name_groups = {game: {} for game in self.ctx.gamespackage}
+        self.ctx.init_game_data()
+
+    def test_encoded_data_package(self) -> None:
+        """Tests that the encoded DataPackage message contains the requested games and is reused"""
+        games = frozenset(("A", "Archipelago"))
+        encoded = self.ctx.get_encoded_data_package(games)
+        self.assertEqual(decode(encoded), [{"cmd": "DataPackage", "data": {"games": {
+            game: self.ctx.gamespackage[game] for game in ("Archipelago", "A")}}}])
+        self.assertIs(self.ctx.get_encoded_data_package(frozenset(("Archipelago", "A"))), encoded)
+
+    def test_encoded_data_package_limit(self) -> None:
+        """Tests that only the most recently requested messages are kept"""
+        self.ctx.encoded_data_package_limit = 2
+        for games in (frozenset("A"), frozenset("B"), frozenset("A"), frozenset("AB")):
+            self.ctx.get_encoded_data_package(games)
+        self.assertEqual(list(self.ctx.encoded_data_packages), [frozenset("A"), frozenset("AB")])
+
+
+class TestServerMetrics(ContextTestCase, unittest.IsolatedAsyncioTestCase):
+    def test_histogram(self) -> None:
+        histogram = DurationHistogram()
+        for duration in (0.0002, 0.0002, 0.003, 20):
+            histogram.add(duration)
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.maximum, 20)
+        self.assertEqual(histogram.get_quantile(0.5), 0.00025)
+        self.assertEqual(histogram.get_quantile(0.75), 0.005)
+        self.assertEqual(histogram.get_quantile(1), 20)
+
+    @mock.patch.object(ServerMetrics, "command_limit", 2)
+    def test_command_limit(self) -> None:
+        """Tests that clients can't make the server record an unlimited number of command names"""
+        metrics = ServerMetrics()
+        for cmd in ("Connect", "Sync", "Bogus", "Connect", None, ["list"]):
+            metrics.add_command(cmd, 0.001)
+        self.assertEqual({cmd: histogram.count for cmd, histogram in metrics.commands.items()},
+                         {"Connect": 2, "Sync": 1, "(other)": 3})
+
+    def test_prometheus_text(self) -> None:
+        metrics = ServerMetrics()
+        metrics.add_command('Say"\\', 0.001)
+        metrics.add_sent("a" * 98 + "ü", 3)
+        text = metrics.get_prometheus_text(2)
+        self.assertIn('archipelago_command_duration_seconds_bucket{cmd="Say\\"\\\\",le="0.001"} 1', text)
+        self.assertIn('archipelago_command_duration_seconds_count{cmd="Say\\"\\\\"} 1', text)
+        self.assertIn('archipelago_save_duration_seconds_bucket{le="+Inf"} 0', text)
+        self.assertIn("archipelago_sent_bytes_total 300\n", text)
+        self.assertIn("archipelago_connections 2\n", text)
+
+    async def test_serve_metrics(self) -> None:
+        self.ctx.metrics.add_sent("0123456789")
+        metrics_server = await serve_metrics(self.ctx, 0)
+        try:
+            port = metrics_server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+        finally:
+            metrics_server.close()
+        self.assertTrue(response.startswith(b"HTTP/1.0 200 OK\r\n"))
+        self.assertIn(b"\r\n\r\n# TYPE", response)
+        self.assertIn(b"archipelago_sent_bytes_total 10\n", response)
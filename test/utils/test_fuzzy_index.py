@@ -0,0 +1,36 @@
+# Tests for FuzzyIndex in Utils.py
+
+import unittest
+from random import Random
+from Utils import FuzzyIndex, get_fuzzy_results, get_intended_text
+
+
+class TestFuzzyIndex(unittest.TestCase):
+    """This tests that FuzzyIndex gives the same results as scoring every name"""
+    def setUp(self) -> None:
+        random = Random(0)
+        parts = ("Progressive", "Sword", "Shield", "Bow", "Arrows", "Key", "Boss", "Small", "Heart", "Container",
+                 "Piece", "Bomb", "Bag", "Rupee", "Ingot", "Single:", "Bundle:", "Ice", "Fire", "Rod")
+        self.names = FuzzyIndex({" ".join(random.sample(parts, random.randint(1, 4))) for _ in range(2000)} |
+                                {f"{count} Coins" for count in range(100)} | {"sword", "SWORD", "Sword"})
+        self.queries = ["Sword", "sword", "sWord", "Progresive Sword", "boss key", "Small Keys", "12 Coin", "Coins",
+                        "", "x", "Bundle: Fire Ice Rod Bomb", "Piece of Heart", "Herat Container"]
+
+    def test_same_results(self) -> None:
+        names = list(self.names)
+        for query in self.queries:
+            for limit in (None, 1, 2, 10):
+                with self.subTest(query=query, limit=limit):
+                    self.assertEqual(get_fuzzy_results(query, self.names, limit),
+                                     get_fuzzy_results(query, names, limit))
+
+    def test_same_intended_text(self) -> None:
+        names = list(self.names)
+        for query in self.queries:
+            with self.subTest(query=query):
+                self.assertEqual(get_intended_text(query, self.names), get_intended_text(query, names))
+
+    def test_set(self) -> None:
+        self.assertIn("sword", self.names)
+        self.assertNotIn("Sword Sword", self.names)
+        self.assertEqual(get_fuzzy_results("x", FuzzyIndex()), [])
@@ -43,3 +43,29 @@ class TestAPIGenerate(TestBase):
         json_data = response.get_json()
         self.assertTrue(json_data["text"].startswith("Generation of seed "))
         self.assertTrue(json_data["text"].endswith(" started successfully."))
+
+    def test_generation_status(self) -> None:
+        from uuid import UUID
+
+        from pony.orm import db_session
+        from WebHostLib.models import Generation, STATE_STARTED
+
+        response = self.client.post(
+            "/api/generate",
+            data=json.dumps({"weights": {"Tester1": {"game": "Archipelago", "name": "Tester", "Archipelago": {}}}}),
+            content_type='application/json'
+        )
+        json_data = response.get_json()
+        response = self.client.get(json_data["wait_api_url"])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json()["text"], "Generation queued")
+
+        with db_session:
+            generation = Generation.get(id=UUID(json_data["detail"]))
+            generation.state = STATE_STARTED
+            meta = json.loads(generation.meta)
+            meta["progress"] = "Creating Items."
+            generation.meta = json.dumps(meta)
+        response = self.client.get(json_data["wait_api_url"])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json(), {"text": "Generation running", "progress": "Creating Items."})
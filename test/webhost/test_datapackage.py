@@ -0,0 +1,28 @@
+import pickle
+
+from . import TestBase
+
+
+class TestDataPackageCache(TestBase):
+    def test_shared_data_package(self) -> None:
+        """Verify that data packages are decoded once per checksum, and missing ones are looked up again."""
+        from pony.orm import db_session
+        from WebHostLib.datapackage import get_data_package, get_game_names
+        from WebHostLib.models import GameDataPackage
+
+        checksum = "test_shared_data_package"
+        with self.app.app_context(), db_session:
+            self.assertIsNone(get_data_package(checksum))
+            GameDataPackage(checksum=checksum, data=pickle.dumps({"item_name_to_id": {"Item": 1},
+                                                                  "location_name_to_id": {"Location": 2}}))
+            data_package = get_data_package(checksum)
+            self.assertEqual(data_package["item_name_to_id"], {"Item": 1})
+            self.assertIs(get_data_package(checksum), data_package)
+
+            names = get_game_names(checksum)
+            self.assertIs(names, get_game_names(checksum))
+            self.assertIs(names.item_name_to_id, data_package["item_name_to_id"])
+            self.assertEqual(names.location_id_to_name[2], "Location")
+            self.assertEqual(names.item_id_to_name[3], "Unknown Item (ID: 3)")
+            self.assertNotIn(3, names.item_id_to_name)
+            GameDataPackage[checksum].delete()
@@ -103,3 +103,22 @@ class TestTracker(TestBase):
                 self.assertEqual(response.status_code, 200)
             with self.client.open(url_for("api.tracker_slot_data", tracker=self.tracker_uuid)) as response:
                 self.assertEqual(response.status_code, 200)
+
+    def test_tracker_data_reuse(self) -> None:
+        """Verify that tracker data reuses decoded data between requests, unless the room saved since."""
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData
+
+        with self.app.app_context(), db_session:
+            room = Room.get(id=self.room_id)
+            first = TrackerData(room)
+            second = TrackerData(room)
+            self.assertIs(first._multidata, second._multidata)
+            for game in first._multidata["datapackage"]:
+                self.assertIs(first.item_id_to_name[game], second.item_id_to_name[game])
+
+            room.multisave = pickle.dumps({"location_checks": {(0, 1): {1}}})
+            self.assertEqual(TrackerData(room).get_player_checked_locations(0, 1), {1})
+            room.multisave = pickle.dumps({"location_checks": {(0, 1): {1, 2}}})
+            self.assertEqual(TrackerData(room).get_player_checked_locations(0, 1), {1, 2})
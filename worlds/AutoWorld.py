@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import concurrent.futures
 import hashlib
+import io
 import logging
+import multiprocessing
 import pathlib
+import pickle
 import sys
 import time
 from random import Random
@@ -192,20 +196,43 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
 
 
 def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
-    world_types: Set[AutoWorldRegister] = set()
     for player in multiworld.player_ids:
         prev_item_count = len(multiworld.itempool)
-        world_types.add(multiworld.worlds[player].__class__)
         call_single(multiworld, method_name, player, *args)
         if __debug__:
-            new_items = multiworld.itempool[prev_item_count:]
-            for i, item in enumerate(new_items):
-                for other in new_items[i+1:]:
-                    assert item is not other, (
-                        f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
-                        f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+            _assert_unique_new_items(multiworld, player, prev_item_count)
 
+    _finish_call_all(multiworld, method_name, *args)
+
+
+def _assert_unique_new_items(multiworld: "MultiWorld", player: int, prev_item_count: int) -> None:
+    new_items = multiworld.itempool[prev_item_count:]
+    for i, item in enumerate(new_items):
+        for other in new_items[i+1:]:
+            assert item is not other, (
+                f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
+                f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+
+
+def _finish_call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     call_stage(multiworld, method_name, *args)
+    if method_name == "create_items":
+        _index_progression_item_names(multiworld)
+
+
+def _index_progression_item_names(multiworld: "MultiWorld") -> None:
+    players = {player for player in multiworld.player_ids if multiworld.worlds[player].compact_item_counts}
+    if not players:
+        return
+    names: Dict[int, Set[str]] = {player: set() for player in players}
+    items: List["Item"] = [*multiworld.itempool, *(location.item for location in multiworld.get_filled_locations())]
+    for player in players:
+        items += multiworld.precollected_items[player]
+    for item in items:
+        if item.advancement and item.player in names:
+            names[item.player].add(item.name)
+    for player in players:
+        multiworld.worlds[player].item_name_indices = {name: index for index, name in enumerate(sorted(names[player]))}
 
 
 def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
@@ -216,6 +243,194 @@ def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
             _timed_call(stage_callable, multiworld, *args)
 
 
+parallel_stages: FrozenSet[str] = frozenset(("generate_early", "create_regions", "create_items", "set_rules"))
+"""Stages call_all_parallel may run in worker processes for worlds with parallel_generation set."""
+
+_parallel_multiworld: Optional["MultiWorld"] = None
+_parallel_shared: Dict[int, Any] = {}
+
+
+def call_all_parallel(multiworld: "MultiWorld", method_name: str, workers: int, *args: Any) -> None:
+    """Like call_all, but runs the stage of the worlds with parallel_generation set in up to `workers` forked
+    processes and installs the changes they made into this process in player order.
+    Players whose changes cannot be sent back (e.g. because they contain lambdas) or whose stage raised are run again
+    in this process, so the result matches call_all. stage_ methods are still called once, in this process."""
+    players = [player for player in multiworld.player_ids if multiworld.worlds[player].parallel_generation]
+    if workers < 1 or len(players) < 2 or method_name not in parallel_stages \
+            or "fork" not in multiprocessing.get_all_start_methods():
+        return call_all(multiworld, method_name, *args)
+
+    global _parallel_multiworld, _parallel_shared
+    workers = min(workers, len(players))
+    chunks = [players[index::workers] for index in range(workers)]
+    results: Dict[int, Optional[bytes]] = {}
+    _parallel_multiworld = multiworld
+    _parallel_shared = _shared_objects(multiworld)
+    try:
+        try:
+            with concurrent.futures.ProcessPoolExecutor(workers, multiprocessing.get_context("fork")) as pool:
+                for chunk_results in pool.map(_call_chunk, chunks, [method_name] * workers, [args] * workers):
+                    results.update(chunk_results)
+        except concurrent.futures.process.BrokenProcessPool:
+            logging.exception(f"Worker process died running {method_name}, running it in this process instead.")
+            results.clear()
+
+        for player in multiworld.player_ids:
+            prev_item_count = len(multiworld.itempool)
+            data = results.get(player)
+            changes = _load_changes(data, player, method_name) if data else None
+            if changes is None:
+                call_single(multiworld, method_name, player, *args)
+            else:
+                _install_changes(multiworld, player, changes)
+            if __debug__:
+                _assert_unique_new_items(multiworld, player, prev_item_count)
+    finally:
+        _parallel_multiworld = None
+        _parallel_shared = {}
+
+    _finish_call_all(multiworld, method_name, *args)
+
+
+def _shared_objects(multiworld: "MultiWorld") -> Dict[int, Any]:
+    """Objects that exist before a stage runs, keyed by id. Forked workers inherit them at the same addresses, which
+    lets the pickled changes refer to them instead of copying them."""
+    objects: List[Any] = [multiworld, multiworld.regions, multiworld.state, multiworld.random,
+                          *multiworld.worlds.values(), *(world.random for world in multiworld.worlds.values()),
+                          *multiworld.completion_condition.values(), *multiworld.itempool]
+    for items in multiworld.precollected_items.values():
+        objects += items
+    for cache in (multiworld.regions.region_cache, multiworld.regions.entrance_cache,
+                  multiworld.regions.location_cache):
+        for objects_by_name in cache.values():
+            objects += objects_by_name.values()
+    for location in multiworld.get_filled_locations():
+        objects.append(location.item)
+    # pre-existing rules and other callables can only be sent back by reference
+    for obj in objects[:]:
+        for value in getattr(obj, "__dict__", {}).values():
+            if callable(value) and not isinstance(value, type):
+                objects.append(value)
+    return {id(obj): obj for obj in objects}
+
+
+def _player_objects(multiworld: "MultiWorld", player: int) -> List[Any]:
+    world = multiworld.worlds[player]
+    objects: List[Any] = [world, world.random, *multiworld.precollected_items[player]]
+    objects += (item for item in multiworld.itempool if item.player == player)
+    for cache in (multiworld.regions.region_cache, multiworld.regions.entrance_cache,
+                  multiworld.regions.location_cache):
+        objects += cache[player].values()
+    objects += (location.item for location in multiworld.get_filled_locations(player))
+    return objects
+
+
+class _SharedPickler(pickle.Pickler):
+    def __init__(self, file: io.BytesIO, shared: Dict[int, Any]):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.shared = shared
+
+    def persistent_id(self, obj: Any) -> Optional[int]:
+        key = id(obj)
+        if key in self.shared and self.shared[key] is obj:
+            return key
+        return None
+
+
+class _SharedUnpickler(pickle.Unpickler):
+    def __init__(self, file: io.BytesIO, shared: Dict[int, Any]):
+        super().__init__(file)
+        self.shared = shared
+
+    def persistent_load(self, pid: int) -> Any:
+        return self.shared[pid]
+
+
+def _call_chunk(players: List[int], method_name: str, args: Tuple[Any, ...]) -> Dict[int, Optional[bytes]]:
+    """Runs in a forked worker. Returns the pickled changes of each player, or None if they have to be redone."""
+    multiworld = _parallel_multiworld
+    assert multiworld, "call_all_parallel workers have to be forked"
+    results: Dict[int, Optional[bytes]] = {}
+    for player in players:
+        try:
+            results[player] = _call_and_pickle_changes(multiworld, player, method_name, args)
+        except Exception:
+            logging.debug(f"Could not run {method_name} for player {player} in a worker process.", exc_info=True)
+            results[player] = None
+    return results
+
+
+def _call_and_pickle_changes(multiworld: "MultiWorld", player: int, method_name: str,
+                             args: Tuple[Any, ...]) -> Optional[bytes]:
+    own_objects = _player_objects(multiworld, player)
+    prev_itempool = multiworld.itempool[:]
+    prev_precollected = multiworld.precollected_items[player][:]
+    prev_random_state = multiworld.random.getstate()
+
+    call_single(multiworld, method_name, player, *args)
+
+    # the order other players draw from the shared random in depends on running in sequence
+    if multiworld.random.getstate() != prev_random_state:
+        return None
+    # earlier items getting removed or replaced can't be expressed as appended items
+    for prev, current in ((prev_itempool, multiworld.itempool),
+                          (prev_precollected, multiworld.precollected_items[player])):
+        if len(current) < len(prev) or any(a is not b for a, b in zip(prev, current)):
+            return None
+    changes = {
+        "states": {id(obj): obj.__getstate__() for obj in own_objects},
+        "new_items": multiworld.itempool[len(prev_itempool):],
+        "new_precollected": multiworld.precollected_items[player][len(prev_precollected):],
+        "regions": multiworld.regions.region_cache[player],
+        "entrances": multiworld.regions.entrance_cache[player],
+        "locations": multiworld.regions.location_cache[player],
+        "early_items": multiworld.early_items[player],
+        "local_early_items": multiworld.local_early_items[player],
+        "completion_condition": multiworld.completion_condition[player],
+        "indirect_connections": {region: entrances for region, entrances in multiworld.indirect_connections.items()
+                                 if region.player == player},
+    }
+    file = io.BytesIO()
+    _SharedPickler(file, _parallel_shared).dump(changes)
+    return file.getvalue()
+
+
+def _load_changes(data: bytes, player: int, method_name: str) -> Optional[Dict[str, Any]]:
+    try:
+        return _SharedUnpickler(io.BytesIO(data), _parallel_shared).load()
+    except Exception:
+        logging.debug(f"Could not load the changes of {method_name} for player {player}.", exc_info=True)
+        return None
+
+
+def _install_changes(multiworld: "MultiWorld", player: int, changes: Dict[str, Any]) -> None:
+    for key, state in changes["states"].items():
+        obj = _parallel_shared[key]
+        if hasattr(obj, "__setstate__"):
+            obj.__setstate__(state)
+            continue
+        if isinstance(state, tuple):
+            state, slots = state
+            for name, value in slots.items():
+                setattr(obj, name, value)
+        if state is not None:
+            obj.__dict__.clear()
+            obj.__dict__.update(state)
+    multiworld.itempool += changes["new_items"]
+    for item in changes["new_precollected"]:
+        multiworld.push_precollected(item)
+    multiworld.regions.region_cache[player] = changes["regions"]
+    multiworld.regions.entrance_cache[player] = changes["entrances"]
+    multiworld.regions.location_cache[player] = changes["locations"]
+    multiworld.early_items[player] = changes["early_items"]
+    multiworld.local_early_items[player] = changes["local_early_items"]
+    multiworld.completion_condition[player] = changes["completion_condition"]
+    for region in [region for region in multiworld.indirect_connections if region.player == player]:
+        del multiworld.indirect_connections[region]
+    multiworld.indirect_connections.update(changes["indirect_connections"])
+    multiworld.state.stale[player] = True
+
+
 class WebWorld(metaclass=WebWorldRegister):
     """Webhost integration"""
 
@@ -318,6 +533,32 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    incremental_reachability: bool = False
+    """If True, the items read by each failed entrance access rule are recorded, and after collecting items only the
+    entrances that read one of the changed item names get rechecked, instead of every blocked entrance.
+    Only usable with explicit_indirect_conditions and if entrance access rules depend on nothing but the state's
+    items (the `has`/`count` family of methods or `state.prog_items`) and indirect conditions.
+    Sweeps and sphere searches record the items read by failed location access rules the same way, which requires
+    location access rules to depend on nothing but the state's items and the reachability of regions, locations and
+    entrances."""
+
+    compact_item_counts: bool = False
+    """If True, the names of this world's progression items are mapped to indices once create_items is done, and the
+    item counts of CollectionStates are kept in an array instead of a dict. Any other name written to `state.prog_items`
+    is still stored by name."""
+
+    item_name_indices: Optional[Dict[str, int]] = None
+    """autoset after create_items if compact_item_counts is True. Maps progression item names to their index in the
+    item count arrays of CollectionStates. Replaced instead of modified, as states keep using the mapping they were
+    created with."""
+
+    parallel_generation: bool = False
+    """If True, generate_early, create_regions, create_items and set_rules may run in a forked worker process when the
+    generator is configured to use them. These stages then may only modify this world, its own regions, entrances,
+    locations, items, early items and completion condition and add to the itempool and its precollected items, and must
+    not use multiworld.random. Anything they create is pickled back to the generator process, so worlds that create
+    lambdas or other unpicklable objects in a stage get that stage rerun in the generator process instead."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int